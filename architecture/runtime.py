@@ -1,15 +1,34 @@
 import architecture.engine as ARCH
 from architecture.engine import ARCH_STATE
-from backend.orchestrator.state import GLOBAL_STATE
 
 class ArchitectureRuntime:
     def __init__(self):
         self.enabled = True
+        self.version = 0
+        self.frame = None
+        self._signature = None
+
+    def _signature_of(self, rooms, edges):
+        return (
+            ARCH_STATE.get("spatial_openness"),
+            ARCH_STATE.get("room_privacy"),
+            ARCH_STATE.get("circulation_style"),
+            tuple((r.get("id"), r["x"], r["y"], r["w"], r["h"], r.get("type", "public")) for r in rooms),
+            tuple((e["from"], e["to"]) for e in edges),
+        )
     
     def step(self):
         if not self.enabled:
             return None
 
+        rooms = getattr(ARCH, "ROOMS", [])
+        edges = getattr(ARCH, "EDGES", [])
+
+        # nothing moved since the last build: hand back the same frame
+        signature = self._signature_of(rooms, edges)
+        if self.frame is not None and signature == self._signature:
+            return self.frame
+
         frame = {
             "rooms": [],
             "edges": [],
@@ -21,7 +40,7 @@ class ArchitectureRuntime:
         }
 
         # rooms (adapt keys if names differ)
-        for r in getattr(ARCH, "ROOMS", []):
+        for r in rooms:
             frame["rooms"].append({
                 "id": r.get("id"),
                 "x": r["x"],
@@ -32,10 +51,12 @@ class ArchitectureRuntime:
             })
 
         # circulation / connections
-        for e in getattr(ARCH, "EDGES", []):
+        for e in edges:
             frame["edges"].append({
                 "from": e["from"],
                 "to": e["to"]
             })
-        GLOBAL_STATE["architecture"] = frame
+        self.frame = frame
+        self._signature = signature
+        self.version += 1
         return frame
\ No newline at end of file
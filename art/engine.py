@@ -74,7 +74,58 @@ def get_flow_vector(x, y, t):
     vec = pygame.Vector2(1, 0).rotate_rad(angle)
     return vec
 
-def get_neighbors(agent, agents, radius):
+NEIGHBOR_RADIUS = 60
+
+class SpatialGrid:
+    """
+    Uniform grid over the canvas for neighbor lookups.
+
+    Cells are at least radius + margin wide, so the 3x3 block around an
+    agent covers its whole neighborhood. The margin absorbs the few pixels
+    agents move after the grid is rebuilt at the start of a tick. Cell
+    lookups wrap around the canvas edges like Agent.edges, so an agent
+    that wrapped mid-tick is still found from the opposite side.
+    """
+    def __init__(self, width=WIDTH, height=HEIGHT, radius=NEIGHBOR_RADIUS, margin=8):
+        cell_size = radius + margin
+        self.cols = max(1, int(width // cell_size))
+        self.rows = max(1, int(height // cell_size))
+        self.cell_w = width / self.cols
+        self.cell_h = height / self.rows
+        self.cells = {}
+
+    def _cell(self, pos):
+        return (
+            int(pos.x // self.cell_w) % self.cols,
+            int(pos.y // self.cell_h) % self.rows
+        )
+
+    def rebuild(self, agents):
+        cells = {}
+        for agent in agents:
+            cells.setdefault(self._cell(agent.pos), []).append(agent)
+        self.cells = cells
+
+    def query(self, agent, radius):
+        cx, cy = self._cell(agent.pos)
+        keys = {
+            ((cx + dx) % self.cols, (cy + dy) % self.rows)
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+        }
+        neighbors = []
+        for key in keys:
+            for other in self.cells.get(key, ()):
+                if other is agent:
+                    continue
+                if agent.pos.distance_to(other.pos) < radius:
+                    neighbors.append(other)
+        return neighbors
+
+def get_neighbors(agent, agents, radius, grid=None):
+    if grid is not None:
+        return grid.query(agent, radius)
+
     neighbors = []
     for other in agents:
         if other is agent:
@@ -313,6 +364,74 @@ def shape_force(agent, t, shape):
 
     return vec * strength
 
+# longer, denser trails for mandala / geometric
+TRAIL_LENGTHS = {
+    "composition": 260,
+    "flow": 180,
+}
+DEFAULT_TRAIL_LENGTH = 120
+MAX_TRAIL_LENGTH = max(DEFAULT_TRAIL_LENGTH, *TRAIL_LENGTHS.values())
+
+def trail_length(mode):
+    return TRAIL_LENGTHS.get(mode, DEFAULT_TRAIL_LENGTH)
+
+class TrailBuffer:
+    """
+    Fixed-capacity ring of trail points. Once full, each append overwrites
+    the oldest point in place instead of shifting a list.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._xs = [0.0] * capacity
+        self._ys = [0.0] * capacity
+        self._start = 0
+        self._len = 0
+
+    def append(self, pos):
+        end = (self._start + self._len) % self.capacity
+        self._xs[end] = pos.x
+        self._ys[end] = pos.y
+        if self._len < self.capacity:
+            self._len += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def set_capacity(self, capacity):
+        """Resize, keeping the newest points that still fit."""
+        keep = list(self)[-capacity:]
+        self.capacity = capacity
+        self._xs = [0.0] * capacity
+        self._ys = [0.0] * capacity
+        for i, (x, y) in enumerate(keep):
+            self._xs[i] = x
+            self._ys[i] = y
+        self._start = 0
+        self._len = len(keep)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        """Yield (x, y) oldest first, straight from the ring storage."""
+        xs, ys, cap = self._xs, self._ys, self.capacity
+        first = min(self._len, cap - self._start)
+        for i in range(self._start, self._start + first):
+            yield (xs[i], ys[i])
+        for i in range(self._len - first):
+            yield (xs[i], ys[i])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("trail index out of range")
+        i = (self._start + index) % self.capacity
+        return pygame.Vector2(self._xs[i], self._ys[i])
+
 class Agent:
     def __init__(self):
         self.pos = pygame.Vector2(
@@ -326,7 +445,7 @@ class Agent:
         self.color_palette = random_color_palette()
         self.color = random.choice(self.color_palette)
         self.color_index = 0
-        self.history = []
+        self.history = TrailBuffer(trail_length(ART_STATE.get("art_mode", "chaos")))
 
     def update(self):
         self.pos += self.vel
@@ -335,18 +454,10 @@ class Agent:
         if self.vel.length() > 1.2:
             self.vel.scale_to_length(1.2)
         self.edges()
-        self.history.append(self.pos.copy())
-
-        # longer, denser trails for mandala / geometric
-        mode = ART_STATE.get("art_mode", "chaos")
-        if mode == "composition":
-            max_len = 260
-        elif mode == "flow":
-            max_len = 180
-        else:
-            max_len = 120
-        if len(self.history) > max_len:
-            self.history.pop(0)
+        max_len = trail_length(ART_STATE.get("art_mode", "chaos"))
+        if self.history.capacity != max_len:
+            self.history.set_capacity(max_len)
+        self.history.append(self.pos)
         self.color_index = (self.color_index + 0.02) % len(self.color_palette)
         self.color = self.color_palette[int(self.color_index)]
 
@@ -357,11 +468,11 @@ class Agent:
         if self.pos.y < 0: self.pos.y = HEIGHT
 
     def draw(self, screen, time):
-        for p in self.history:
+        for x, y in self.history:
             pygame.draw.circle(
                 screen,
                 self.color,
-                (int(p.x), int(p.y)),
+                (int(x), int(y)),
                 2
             )
         pygame.draw.circle(
@@ -385,14 +496,14 @@ class Agent:
         dy = HEIGHT - self.pos.y
         pygame.draw.circle(screen, self.color, (int(dx), int(dy)), 2)
     
-    def apply_behaviors(self, agents, time, state, pattern_stable=False):
+    def apply_behaviors(self, agents, time, state, pattern_stable=False, grid=None):
         ART_MODE = state.get("art_mode", "calm")
 
         EMOTION = state.get("emotion", "calm")
         FLOW_STRENGTH = state.get("flow_noise", 0.02)
         SHAPE = state.get("shape", "freeform")
 
-        neighbors = get_neighbors(self, agents, 60)
+        neighbors = get_neighbors(self, agents, NEIGHBOR_RADIUS, grid)
         if ART_MODE == "calm":
             align_force = alignment(self, neighbors, 0.04)
             cohesion_force = cohesion(self, neighbors, 0.003)
@@ -452,6 +563,14 @@ class Agent:
         else:
             self.vel += shape_force(self, time, SHAPE)
 
+def get_frame_meta():
+    return {
+        "emotion": ART_STATE.get("emotion"),
+        "symmetry": ART_STATE.get("symmetry"),
+        "flow_noise": ART_STATE.get("flow_noise"),
+        "art_mode": ART_STATE.get("art_mode")
+    }
+
 def get_frame_state(agents):
     return {
         "agents": [
@@ -459,14 +578,9 @@ def get_frame_state(agents):
                 "x": a.pos.x,
                 "y": a.pos.y,
                 "color": a.color,
-                "trail": [(p.x, p.y) for p in a.history]
+                "trail": list(a.history)
             }
             for a in agents
         ],
-        "meta": {
-            "emotion": ART_STATE.get("emotion"),
-            "symmetry": ART_STATE.get("symmetry"),
-            "flow_noise": ART_STATE.get("flow_noise"),
-            "art_mode": ART_STATE.get("art_mode")
-        }
+        "meta": get_frame_meta()
     }
\ No newline at end of file
@@ -0,0 +1,84 @@
+# art/frame.py
+from collections.abc import Mapping, Sequence
+
+
+class ArtFrame(Mapping):
+    """
+    An art frame kept as the arrays it was copied from: pos (n, 2),
+    color (n, 3) and trails (n, length, 2), oldest point first.
+
+    Reads like the dict art.engine.get_frame_state() returns, but agent
+    dicts are only built for the agents a consumer actually reads; the
+    wire and delta encoders work on the arrays directly.
+    """
+    def __init__(self, pos, color, trails, meta):
+        self.pos = pos
+        self.color = color
+        self.trails = trails
+        self.meta = meta
+        self._dict = None
+
+    def __getitem__(self, key):
+        if key == "agents":
+            return AgentList(self)
+        if key == "meta":
+            return self.meta
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("agents", "meta"))
+
+    def __len__(self):
+        return 2
+
+    def to_dict(self):
+        """The whole frame as plain dicts, built once (e.g. for JSON)."""
+        if self._dict is None:
+            xs = self.pos[:, 0].tolist()
+            ys = self.pos[:, 1].tolist()
+            colors = [tuple(c) for c in self.color.tolist()]
+            trails = self.trails.tolist()
+            self._dict = {
+                "agents": [
+                    {
+                        "x": xs[i],
+                        "y": ys[i],
+                        "color": colors[i],
+                        "trail": trails[i]
+                    }
+                    for i in range(len(xs))
+                ],
+                "meta": self.meta
+            }
+        return self._dict
+
+
+class AgentList(Sequence):
+    """frame["agents"] of an ArtFrame; indexing builds just that agent's dict."""
+    def __init__(self, frame):
+        self.frame = frame
+        self.pos = frame.pos
+
+    def __len__(self):
+        return len(self.frame.pos)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        frame = self.frame
+        x, y = frame.pos[index].tolist()
+        return {
+            "x": x,
+            "y": y,
+            "color": tuple(frame.color[index].tolist()),
+            "trail": frame.trails[index].tolist()
+        }
+
+    def __iter__(self):
+        # lazily too: the music mapper stops after a handful of agents
+        if self.frame._dict is not None:
+            return iter(self.frame._dict["agents"])
+        return (self[i] for i in range(len(self)))
+
+    def to_list(self):
+        return self.frame.to_dict()["agents"]
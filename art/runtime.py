@@ -1,15 +1,38 @@
 # art/runtime.py
-import time
+import os
+import math
+import random
 import threading
-from art.engine import Agent, get_frame_state, ART_STATE
+import pygame
+from art.engine import Agent, SpatialGrid, get_frame_state, ART_STATE
+from backend.utils.scheduler import FixedRateLoop
+
+# "objects" steps one Agent at a time, "numpy" uses the batched VectorSwarm
+ART_BACKEND = os.getenv("ART_BACKEND", "objects")
+# simulation rate, independent of how often frames are broadcast
+ART_TICK_HZ = float(os.getenv("ART_TICK_HZ", "60"))
 
 class ArtRuntime:
-    def __init__(self, agent_count=50):
-        self.agents = [Agent() for _ in range(agent_count)]
+    def __init__(self, agent_count=50, backend=None, tick_hz=ART_TICK_HZ):
+        self.backend = backend or ART_BACKEND
+        if self.backend == "numpy":
+            from art.vectorized import VectorSwarm
+            self.swarm = VectorSwarm(agent_count)
+            self.agents = []
+        else:
+            self.swarm = None
+            self.agents = [Agent() for _ in range(agent_count)]
+        self.grid = SpatialGrid()
         self.running = False
         self.thread = None
         self.frame = None
         self.t = 0
+        self.ticks = 0
+        self._frame_tick = 0
+        # serializes tick, the controller hooks (request threads) and frame
+        # copies in get_frame; frames are not mutated once built
+        self.lock = threading.Lock()
+        self.scheduler = FixedRateLoop("art", tick_hz)
 
     def start(self):
         if self.running:
@@ -19,20 +42,71 @@ class ArtRuntime:
         self.thread.start()
 
     def loop(self):
-        while self.running:
+        self.scheduler.run(self.tick, lambda: self.running)
+
+    def tick(self):
+        with self.lock:
             paused = ART_STATE.get("paused", False)
-            for agent in self.agents:
+            if self.swarm is not None:
                 if paused:
-                    agent.vel *= 0.90
+                    self.swarm.damp(0.90)
                 else:
-                    agent.apply_behaviors(self.agents, self.t, ART_STATE)
-                    agent.update()
-
-            self.frame = get_frame_state(self.agents)
+                    self.swarm.apply_behaviors(self.t, ART_STATE)
+                    self.swarm.update()
+            else:
+                if not paused:
+                    self.grid.rebuild(self.agents)
+                for agent in self.agents:
+                    if paused:
+                        agent.vel *= 0.90
+                    else:
+                        agent.apply_behaviors(self.agents, self.t, ART_STATE, grid=self.grid)
+                        agent.update()
             self.t += 0.01
-            time.sleep(1 / 60)
+            self.ticks += 1
+
+    def clear_trails(self):
+        with self.lock:
+            if self.swarm is not None:
+                self.swarm.clear_trails()
+            for agent in self.agents:
+                agent.history.clear()
+
+    def reset_shape_memory(self):
+        with self.lock:
+            if self.swarm is not None:
+                self.swarm.reset_shape_memory()
+            for agent in self.agents:
+                if hasattr(agent, "_shape_mem"):
+                    agent._shape_mem["star_target"] = None
+                    agent._shape_mem["star_timer"] = 0
+
+    def scatter_velocities(self):
+        """Give every agent a fresh random heading, as after an art_mode switch."""
+        with self.lock:
+            if self.swarm is not None:
+                self.swarm.scatter_velocities(0.6, 1.2)
+            for agent in self.agents:
+                angle = random.uniform(0, 2 * math.pi)
+                agent.vel = pygame.Vector2(
+                    math.cos(angle),
+                    math.sin(angle)
+                ) * random.uniform(0.6, 1.2)
 
     def get_frame(self):
+        """
+        Latest frame. Built here rather than in tick, so it costs one copy
+        per broadcast instead of per simulation step, and at most one per tick.
+        """
+        if self._frame_tick != self.ticks:
+            with self.lock:
+                if self.swarm is not None:
+                    frame = self.swarm.get_frame_state()
+                else:
+                    frame = get_frame_state(self.agents)
+                # one reference swap; readers see the previous frame or this one
+                self.frame = frame
+                self._frame_tick = self.ticks
         return self.frame
 
-ART_RUNTIME = ArtRuntime()
\ No newline at end of file
+ART_RUNTIME = ArtRuntime()
@@ -0,0 +1,187 @@
+# art/vectorized.py
+import math
+
+import numpy as np
+
+from art.engine import (
+    ART_STATE,
+    CENTER_X,
+    CENTER_Y,
+    FOCAL_POINTS,
+    HEIGHT,
+    MAX_TRAIL_LENGTH,
+    WIDTH,
+    get_frame_meta,
+    random_color_palette,
+    trail_length,
+)
+from art.frame import ArtFrame
+
+CENTER = np.array([CENTER_X, CENTER_Y])
+FOCAL_ARRAY = np.array(FOCAL_POINTS, dtype=float)
+MAX_SPEED = 1.2
+
+
+def _normalize(vecs):
+    """Row-wise unit vectors; zero rows stay zero like Vector2 guards do."""
+    lengths = np.hypot(vecs[:, 0], vecs[:, 1])
+    safe = np.where(lengths > 0, lengths, 1.0)
+    return vecs / safe[:, None], lengths
+
+
+def _targets(angle, radius):
+    return CENTER + np.stack([np.cos(angle), np.sin(angle)], axis=1) * np.reshape(radius, (-1, 1))
+
+
+class VectorSwarm:
+    """
+    Structure-of-arrays version of a list of art.engine.Agent.
+
+    Positions, velocities, colours and trails live in NumPy arrays and
+    every tick is a handful of batched operations, mirroring
+    Agent.apply_behaviors followed by Agent.update.
+    """
+    def __init__(self, agent_count=50, seed=None):
+        self.rng = np.random.default_rng(seed)
+        n = agent_count
+        self.n = n
+        self.pos = self.rng.integers(0, [WIDTH + 1, HEIGHT + 1], size=(n, 2)).astype(float)
+        self.vel = self.rng.uniform(-2, 2, size=(n, 2))
+
+        self.palettes = np.array([random_color_palette() for _ in range(n)], dtype=np.int64)
+        self.color_index = np.zeros(n)
+        self.color = self.palettes[np.arange(n), self.rng.integers(0, self.palettes.shape[1], size=n)]
+
+        # per-agent constellation memory (index into FOCAL_POINTS, -1 = none)
+        self.star_target = np.full(n, -1)
+        self.star_timer = np.zeros(n, dtype=np.int64)
+
+        # trails advance in lockstep, so one head/count serves every agent
+        self.trails = np.zeros((n, MAX_TRAIL_LENGTH, 2))
+        self.trail_head = 0
+        self.trail_count = 0
+
+    # ---- forces ----
+
+    def shape_force(self, t, shape):
+        pos = self.pos
+        x, y = pos[:, 0], pos[:, 1]
+
+        if shape == "ring":
+            vec = _targets(t * 0.8 + x * 0.001, 220 + math.sin(t * 0.4) * 20) - pos
+        elif shape == "spiral":
+            vec = _targets(t * 0.7 + y * 0.002, 40 + t * 30) - pos
+        elif shape == "petal":
+            angle = np.arctan2(y - CENTER_Y, x - CENTER_X)
+            r = 200 + 20 * math.sin(t * 0.6) + 60 * np.sin(6 * angle)
+            vec = _targets(angle, r) - pos
+        elif shape == "constellation":
+            fresh = self.star_target < 0
+            self.star_target[fresh] = self.rng.integers(0, len(FOCAL_POINTS), size=fresh.sum())
+            self.star_timer += 1
+            expired = self.star_timer > 180
+            self.star_target[expired] = self.rng.integers(0, len(FOCAL_POINTS), size=expired.sum())
+            self.star_timer[expired] = 0
+            vec = (FOCAL_ARRAY[self.star_target] - pos) * 1.5
+        elif shape == "vortex":
+            to_center = CENTER - pos
+            vec = np.stack([-to_center[:, 1], to_center[:, 0]], axis=1)
+        elif shape == "orbit":
+            vec = _targets(t * 0.6 + y * 0.002, 220 + 40 * math.sin(t * 0.4)) - pos
+        elif shape == "rays":
+            angle = np.arctan2(y - CENTER_Y, x - CENTER_X)
+            step = (2 * math.pi) / ART_STATE.get("symmetry", 8)
+            snapped = np.round(angle / step) * step
+            vec = _targets(snapped, 260 + 40 * math.sin(t * 0.9)) - pos
+        else:
+            return np.zeros_like(pos)
+
+        strength = 0.005
+        if shape in ("spiral", "rays"):
+            strength = 0.007
+        if shape == "orbit":
+            strength = 0.004
+        return vec * strength
+
+    # ---- tick ----
+
+    def apply_behaviors(self, t, state, pattern_stable=False):
+        mode = state.get("art_mode", "calm")
+        n = self.n
+
+        # calm / galaxy build boids steering in Agent.apply_behaviors but never
+        # add it to vel, so the frame is unaffected and we skip the work here.
+        if mode == "chaos":
+            perp, _ = _normalize(np.stack([-self.vel[:, 1], self.vel[:, 0]], axis=1))
+            self.vel += perp * 0.08
+            self.vel += self.rng.uniform(-1, 1, size=(n, 2)) * 0.05
+
+        if mode == "flow":
+            to_center = CENTER - self.pos
+            unit, _ = _normalize(to_center)
+            self.vel += np.stack([-unit[:, 1], unit[:, 0]], axis=1) * 0.08
+            self.vel += to_center * 0.0006
+            self.vel += self.rng.uniform(-0.3, 0.3, size=(n, 2)) * 0.03
+
+        if mode == "composition":
+            angle = np.arctan2(self.pos[:, 1] - CENTER_Y, self.pos[:, 0] - CENTER_X)
+            step = (2 * math.pi) / state.get("symmetry", 6)
+            snapped = np.round(angle / step) * step
+            self.vel += (_targets(snapped, 220) - self.pos) * 0.002
+            self.vel += (CENTER - self.pos) * 0.0008
+
+        if pattern_stable:
+            self.pos += np.array([math.sin(t * 0.2) * 0.2, math.cos(t * 0.2) * 0.2])
+        else:
+            self.vel += self.shape_force(t, state.get("shape", "freeform"))
+
+    def update(self):
+        self.pos += self.vel
+
+        unit, speed = _normalize(self.vel)
+        self.vel = np.where((speed > 0)[:, None], self.vel + (unit - self.vel) * 0.1, self.vel)
+        unit, speed = _normalize(self.vel)
+        self.vel = np.where((speed > MAX_SPEED)[:, None], unit * MAX_SPEED, self.vel)
+
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        x[x > WIDTH] = 0
+        x[x < 0] = WIDTH
+        y[y > HEIGHT] = 0
+        y[y < 0] = HEIGHT
+
+        self.trails[:, self.trail_head] = self.pos
+        self.trail_head = (self.trail_head + 1) % MAX_TRAIL_LENGTH
+        self.trail_count = min(self.trail_count + 1, MAX_TRAIL_LENGTH)
+
+        self.color_index = (self.color_index + 0.02) % self.palettes.shape[1]
+        self.color = self.palettes[np.arange(self.n), self.color_index.astype(int)]
+
+    def damp(self, factor=0.90):
+        self.vel *= factor
+
+    # ---- controller hooks ----
+
+    def clear_trails(self):
+        self.trail_head = 0
+        self.trail_count = 0
+
+    def reset_shape_memory(self):
+        self.star_target[:] = -1
+        self.star_timer[:] = 0
+
+    def scatter_velocities(self, low=0.6, high=1.2):
+        angle = self.rng.uniform(0, 2 * math.pi, size=self.n)
+        speed = self.rng.uniform(low, high, size=self.n)
+        self.vel = np.stack([np.cos(angle), np.sin(angle)], axis=1) * speed[:, None]
+
+    # ---- output ----
+
+    def trail_view(self):
+        """Trails as an (n, len, 2) array, oldest point first."""
+        length = min(self.trail_count, trail_length(ART_STATE.get("art_mode", "chaos")))
+        order = (self.trail_head - length + np.arange(length)) % MAX_TRAIL_LENGTH
+        return self.trails[:, order]
+
+    def get_frame_state(self):
+        """Copy of the current arrays; agent dicts are built only when read, see ArtFrame."""
+        return ArtFrame(self.pos.copy(), self.color.copy(), self.trail_view(), get_frame_meta())
@@ -1,24 +1,58 @@
-from fastapi import APIRouter
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 
 from backend.orchestrator.controller import apply_parameters
 from backend.orchestrator.ws_manager import manager
-from backend.orchestrator.state import GLOBAL_STATE
-from backend.llm.interpreter import interpret_prompt
+from backend.orchestrator.state import snapshot as latest_state
+from backend.llm.interpreter import interpret_with_groq, interpret_without_llm
 
-from art.runtime import ART_RUNTIME
 from art.engine import ART_STATE
 
-from architecture.runtime import ArchitectureRuntime
-from music.runtime import MusicRuntime
-from story.runtime import StoryRuntime
+router = APIRouter()
 
-ARCH_RUNTIME = ArchitectureRuntime()
-MUSIC_RUNTIME = MusicRuntime()
-STORY_RUNTIME = StoryRuntime()
+# Groq calls are blocking, so they run on a small pool instead of the event loop
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "20"))
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+_LLM_SLOTS = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
 
-router = APIRouter()
+
+async def interpret_with_limits(text: str):
+    """
+    Resolve keyword and cached prompts locally, otherwise ask Groq off
+    the event loop. Rejects with 429 when every LLM slot is busy and 503
+    when the call misses its deadline. A timed-out call keeps its slot
+    until the thread really finishes, so a stuck Groq can't pile up
+    unbounded work behind the pool.
+    """
+    # keyword and cached prompts resolve right here, without an LLM slot or thread
+    known = interpret_without_llm(text)
+    if known is not None:
+        return known
+
+    if not _LLM_SLOTS.acquire(blocking=False):
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many prompts in flight ({LLM_MAX_CONCURRENCY}), try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    future = LLM_EXECUTOR.submit(interpret_with_groq, text)
+    future.add_done_callback(lambda _: _LLM_SLOTS.release())
+
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=LLM_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Prompt interpretation timed out after {LLM_TIMEOUT_S:g}s",
+            headers={"Retry-After": "5"}
+        )
 
 
 class Intent(BaseModel):
@@ -41,7 +75,7 @@ async def chat(payload: TextPrompt):
     
     # Use LLM to interpret the text into structured intent
     try:
-        intent = interpret_prompt(payload.text)
+        intent = await interpret_with_limits(payload.text)
         print(f"🤖 LLM interpreted intent: {intent}")
         
         if not intent:
@@ -51,26 +85,11 @@ async def chat(payload: TextPrompt):
         # Apply the interpreted intent
         apply_parameters(intent)
         
-        # Generate updated frames
-        art_frame = ART_RUNTIME.get_frame()
-        if art_frame:
-            GLOBAL_STATE["art_frame"] = art_frame
-        
-        music_frame = MUSIC_RUNTIME.step(art_frame)
-        if music_frame:
-            GLOBAL_STATE["music_frame"] = music_frame
-        
-        story_frame = STORY_RUNTIME.step(events=[])
-        if story_frame:
-            GLOBAL_STATE["story_frame"] = story_frame
-        
-        architecture_frame = ARCH_RUNTIME.step()
-        if architecture_frame:
-            GLOBAL_STATE["architecture"] = architecture_frame
-
-        # Broadcast GLOBAL_STATE to match what frame_loop broadcasts
+        # frame_loop steps the shared runtimes; send the latest frames now
+        # so clients see the new intent without waiting for the next tick
+        # Broadcast the latest snapshot to match what frame_loop broadcasts
         snapshot = {
-            **GLOBAL_STATE,
+            **latest_state(),
             "meta": {
                 "art_state": ART_STATE
             }
@@ -83,6 +102,8 @@ async def chat(payload: TextPrompt):
 
         return {"status": "ok", "intent": intent}
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"⚠️ Error interpreting prompt: {e}")
         import traceback
@@ -100,26 +121,10 @@ async def interpret(payload: Intent):
     # Update intent parameters (ART_STATE, MUSIC_STATE, etc.)
     apply_parameters(data)
 
-    art_frame = ART_RUNTIME.get_frame()
-    if art_frame:
-        GLOBAL_STATE["art_frame"] = art_frame
-    
-    music_frame = MUSIC_RUNTIME.step(art_frame)
-    if music_frame:
-        GLOBAL_STATE["music_frame"] = music_frame
-    
-    story_frame = STORY_RUNTIME.step(events=[])
-    if story_frame:
-        GLOBAL_STATE["story_frame"] = story_frame
-    
-    architecture_frame = ARCH_RUNTIME.step()
-    if architecture_frame:
-        GLOBAL_STATE["architecture"] = architecture_frame
-
-    # Broadcast GLOBAL_STATE to match what frame_loop broadcasts
+    # Broadcast the latest snapshot to match what frame_loop broadcasts
     # This ensures consistency across all WebSocket updates
     snapshot = {
-        **GLOBAL_STATE,
+        **latest_state(),
         "meta": {
             "art_state": ART_STATE
         }
@@ -1,21 +1,36 @@
-import os
+import asyncio
 import base64
-import time
-import uuid
+import hashlib
+import random
 from typing import Optional
 
-import requests
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 
-from backend.orchestrator.state import GLOBAL_STATE
+from backend.comfyui.client import COMFYUI, SubmissionError
+from backend.comfyui.image_cache import IMAGE_CACHE, workflow_hash
+from backend.comfyui.jobs import ImageJob, ImageJobQueue, QueueFull
+from backend.comfyui.models import MODEL_CATALOG
+from backend.orchestrator.state import publish, snapshot
 
 
 router = APIRouter()
 
+MAX_PROGRESS_ENTRIES = 8  # recent jobs kept in the image_progress section
+MAX_SEED = 2147483647
+
 
 class ImageRequest(BaseModel):
     prompt: Optional[str] = None
+    negative_prompt: Optional[str] = None
+    # pin a checkpoint instead of the first one ComfyUI lists
+    model: Optional[str] = None
+    # images to render; fresh=True skips dedupe to get new variations
+    count: int = 1
+    fresh: bool = False
+    # also return the PNG as base64 instead of only its URL
+    inline: bool = False
 
 
 def build_prompt_from_state(user_prompt: Optional[str] = None) -> str:
@@ -23,9 +38,10 @@ def build_prompt_from_state(user_prompt: Optional[str] = None) -> str:
     Turn the current art / music / architecture state into
     a descriptive text prompt for a generative image model.
     """
-    art_meta = GLOBAL_STATE.get("art_frame", {}).get("meta", {}) or {}
-    arch = GLOBAL_STATE.get("architecture", {}) or {}
-    music_meta = GLOBAL_STATE.get("music_frame", {}).get("meta", {}) or {}
+    state = snapshot()
+    art_meta = state.get("art_frame", {}).get("meta", {}) or {}
+    arch = state.get("architecture", {}) or {}
+    music_meta = state.get("music_frame", {}).get("meta", {}) or {}
 
     pieces = []
     if user_prompt:
@@ -63,7 +79,7 @@ def build_prompt_from_state(user_prompt: Optional[str] = None) -> str:
     return ", ".join(pieces)
 
 
-def build_comfyui_workflow(prompt: str, negative_prompt: str = "", width: int = 768, height: int = 768, steps: int = 30, cfg_scale: float = 7.0, model_name: str = "sd_xl_base_1.0.safetensors") -> dict:
+def build_comfyui_workflow(prompt: str, negative_prompt: str = "", width: int = 768, height: int = 768, steps: int = 30, cfg_scale: float = 7.0, model_name: str = "sd_xl_base_1.0.safetensors", batch_size: int = 1, seed: Optional[int] = None) -> dict:
     """
     Build a ComfyUI workflow JSON for text-to-image generation.
     This creates a simple workflow with CLIP encoding, KSampler, and VAEDecode.
@@ -76,6 +92,9 @@ def build_comfyui_workflow(prompt: str, negative_prompt: str = "", width: int =
     - Node 5: KSampler (generates latent)
     - Node 6: VAEDecode (decodes to image)
     - Node 7: SaveImage (saves the image)
+
+    seed defaults to a random one; pass a fixed seed to make the workflow
+    (and so its image cache key) reproducible.
     """
     
     workflow = {
@@ -103,13 +122,13 @@ def build_comfyui_workflow(prompt: str, negative_prompt: str = "", width: int =
             "inputs": {
                 "width": width,
                 "height": height,
-                "batch_size": 1
+                "batch_size": batch_size
             },
             "class_type": "EmptyLatentImage"
         },
         "5": {  # KSampler
             "inputs": {
-                "seed": int(time.time()) % 2147483647,
+                "seed": random.randrange(MAX_SEED) if seed is None else seed,
                 "steps": steps,
                 "cfg": cfg_scale,
                 "sampler_name": "euler",
@@ -141,180 +160,173 @@ def build_comfyui_workflow(prompt: str, negative_prompt: str = "", width: int =
     return workflow
 
 
-def get_available_models(comfyui_url: str) -> Optional[str]:
-    """Get first available checkpoint model from ComfyUI."""
-    try:
-        resp = requests.get(f"{comfyui_url}/object_info", timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            # ComfyUI returns model list in different formats
-            checkpoint_info = data.get("CheckpointLoaderSimple", {})
-            if checkpoint_info:
-                # Try different possible structures
-                ckpt_name_info = checkpoint_info.get("input", {}).get("required", {}).get("ckpt_name", [])
-                if isinstance(ckpt_name_info, list) and len(ckpt_name_info) > 0:
-                    # Usually it's a list of strings
-                    if isinstance(ckpt_name_info[0], str):
-                        return ckpt_name_info[0]
-                    elif isinstance(ckpt_name_info[0], list) and len(ckpt_name_info[0]) > 0:
-                        return ckpt_name_info[0][0]
-    except Exception as e:
-        print(f"⚠️ Could not fetch available models: {e}")
-    return None
-
-
-def call_comfyui_api(prompt: str, negative_prompt: str = "") -> Optional[str]:
+def _publish_progress(job: ImageJob):
+    """Expose job status and progress as the image_progress section of the broadcast state."""
+    current = dict(snapshot().get("image_progress") or {})
+    current.pop(job.id, None)
+    current[job.id] = {**(job.progress or {}), "status": job.status}
+    while len(current) > MAX_PROGRESS_ENTRIES:
+        current.pop(next(iter(current)))
+    publish("image_progress", current)
+
+
+def prompt_seed(prompt: str, negative_prompt: str, model_name: str) -> int:
+    """Same prompt and model, same seed, so unchanged requests hit the image cache."""
+    raw = "\x1f".join([prompt, negative_prompt or "", model_name])
+    return int(hashlib.sha256(raw.encode("utf-8")).hexdigest()[:8], 16) % MAX_SEED
+
+
+async def render_images(prompt: str, negative_prompt: str, model: Optional[str], batch_size: int, on_progress, fresh: bool = False) -> list:
     """
-    Call ComfyUI's API to generate an image.
-    
-    ComfyUI workflow:
+    Render one workflow and return the IMAGE_CACHE names of its images.
+
+    The workflow is hashed first; if it was rendered before, the cached
+    PNGs are returned without touching ComfyUI. Otherwise:
     1. POST /prompt with workflow JSON → get prompt_id
-    2. Poll /history/{prompt_id} until complete
-    3. Download image from ComfyUI's output folder or get base64
-    
-    Returns base64 PNG data string on success, or None on failure.
+    2. Wait for ComfyUI's websocket to report the prompt finished
+    3. Download the images via /view and store them in the cache
+    fresh=True uses a random seed, so it always renders and its images
+    are only stored to be served, never looked up again.
     """
-    comfyui_url = os.getenv("COMFYUI_URL", "http://127.0.0.1:8188")
-    client_id = str(uuid.uuid4())
-    
-    # Try to get available models first
-    detected_model = get_available_models(comfyui_url)
-    model_name = detected_model or "sd_xl_base_1.0.safetensors"  # fallback to default
-    print(f"📦 Using model: {model_name}")
-    
-    # Build workflow with detected model
-    workflow = build_comfyui_workflow(prompt, negative_prompt, model_name=model_name)
-    
+    # from the cached catalog, ComfyUI isn't asked per request
+    model_name = MODEL_CATALOG.choose(model)
+    seed = None if fresh else prompt_seed(prompt, negative_prompt, model_name)
+    workflow = build_comfyui_workflow(prompt, negative_prompt, model_name=model_name, batch_size=batch_size, seed=seed)
+    key = workflow_hash(workflow)
+
+    cached = None if fresh else IMAGE_CACHE.get(key)
+    if cached is not None and len(cached) >= batch_size:
+        print(f"💾 Image cache hit: {key[:12]} ({len(cached)} image(s))")
+        on_progress({"status": "cached"})
+        return cached
+
+    print(f"📦 Using model: {model_name} (batch of {batch_size})")
     try:
-        # Step 1: Submit the prompt
-        submit_url = f"{comfyui_url}/prompt"
-        payload = {
-            "prompt": workflow,
-            "client_id": client_id
-        }
-        
-        # Debug: print workflow structure (first 500 chars)
-        import json
-        workflow_str = json.dumps(workflow, indent=2)
-        print(f"🔍 Sending workflow (first 500 chars):\n{workflow_str[:500]}...")
-        
-        submit_resp = requests.post(
-            submit_url,
-            json=payload,
-            timeout=10
+        prompt_id, images = await COMFYUI.generate(
+            workflow,
+            on_progress=lambda _prompt_id, progress: on_progress(progress)
         )
-        
-        # Better error reporting
-        if submit_resp.status_code != 200:
-            error_text = submit_resp.text
-            print(f"⚠️ ComfyUI API error {submit_resp.status_code}: {error_text}")
-            try:
-                error_json = submit_resp.json()
-                print(f"⚠️ Error details: {json.dumps(error_json, indent=2)}")
-            except:
-                pass
-            # Also print the full workflow for debugging
-            print(f"🔍 Full workflow sent:\n{workflow_str}")
-            return None
-        
-        submit_resp.raise_for_status()
-        submit_data = submit_resp.json()
-        prompt_id = submit_data.get("prompt_id")
-        
-        if not prompt_id:
-            print("⚠️ ComfyUI: No prompt_id returned")
-            print(f"⚠️ Response: {submit_data}")
-            return None
-        
-        print(f"✅ ComfyUI: Prompt submitted, prompt_id={prompt_id}")
-        
-        # Step 2: Poll for completion (check history)
-        max_wait = 120  # 2 minutes max
-        start_time = time.time()
-        
-        while time.time() - start_time < max_wait:
-            time.sleep(2)  # Poll every 2 seconds
-            
-            history_url = f"{comfyui_url}/history/{prompt_id}"
-            history_resp = requests.get(history_url, timeout=5)
-            
-            if history_resp.status_code == 200:
-                history_data = history_resp.json()
-                
-                # Check if prompt is complete
-                if prompt_id in history_data:
-                    output_data = history_data[prompt_id]
-                    outputs = output_data.get("outputs", {})
-                    
-                    # Find the SaveImage node output
-                    for node_id, node_output in outputs.items():
-                        if "images" in node_output:
-                            images = node_output["images"]
-                            if images and len(images) > 0:
-                                # Get the image filename
-                                image_info = images[0]
-                                filename = image_info.get("filename", "")
-                                subfolder = image_info.get("subfolder", "")
-                                
-                                # Step 3: Download the image
-                                image_url = f"{comfyui_url}/view"
-                                params = {
-                                    "filename": filename,
-                                    "subfolder": subfolder,
-                                    "type": "output"
-                                }
-                                
-                                img_resp = requests.get(image_url, params=params, timeout=10)
-                                if img_resp.status_code == 200:
-                                    # Convert to base64
-                                    img_b64 = base64.b64encode(img_resp.content).decode('utf-8')
-                                    print(f"✅ ComfyUI: Image generated successfully")
-                                    return img_b64
-                    
-                    # Still processing
-                    continue
-            
-            # Check queue status
-            queue_url = f"{comfyui_url}/queue"
-            queue_resp = requests.get(queue_url, timeout=5)
-            if queue_resp.status_code == 200:
-                queue_data = queue_resp.json()
-                # Check if our prompt is still in queue
-                queue_running = queue_data.get("queue_running", [])
-                queue_pending = queue_data.get("queue_pending", [])
-                
-                found = False
-                for item in queue_running + queue_pending:
-                    if item[1] == prompt_id:
-                        found = True
-                        break
-                
-                if not found:
-                    # Not in queue anymore, check history one more time
-                    continue
-        
-        print("⚠️ ComfyUI: Timeout waiting for image generation")
-        return None
-        
-    except Exception as e:
-        print(f"⚠️ ComfyUI API error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+    except SubmissionError:
+        # most often a checkpoint that's gone; re-list before the next request
+        MODEL_CATALOG.invalidate()
+        raise
+
+    print(f"✅ ComfyUI: {len(images)} image(s) generated ({prompt_id})")
+    pngs = await asyncio.gather(*(COMFYUI.view(image) for image in images))
+    return await asyncio.to_thread(IMAGE_CACHE.put, key, pngs, not fresh)
+
+
+def images_available(names: list) -> bool:
+    """False once any of a finished job's images was evicted from the cache."""
+    return all(IMAGE_CACHE.path(name) is not None for name in names)
+
+
+IMAGE_JOBS = ImageJobQueue(render_images, on_update=_publish_progress, results_valid=images_available)
+
+
+def _submit(payload: ImageRequest):
+    if payload.model and not MODEL_CATALOG.knows(payload.model):
+        raise HTTPException(status_code=400, detail={"error": f"unknown model: {payload.model}", "models": MODEL_CATALOG.models})
+
+    prompt = build_prompt_from_state(payload.prompt)
+    try:
+        return IMAGE_JOBS.submit(prompt, payload.negative_prompt or "", payload.model, payload.count, payload.fresh)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+def image_url(name: str) -> str:
+    return f"/images/{name}"
+
+
+def _job_or_404(job_id: str) -> ImageJob:
+    job = IMAGE_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"unknown image job: {job_id}")
+    return job
+
+
+# async: ImageJobQueue lives on the event loop, sync routes would run in the threadpool
+@router.post("/image-jobs", status_code=202)
+async def submit_image_job(payload: ImageRequest):
+    """
+    Queue a figurative image for the current state. Returns straight away;
+    an identical request that is already queued, running or recently
+    finished returns that job instead of a new one.
+    """
+    job, deduped = _submit(payload)
+    return {**job.to_dict(), "deduped": deduped, "position": IMAGE_JOBS.position(job)}
+
+
+@router.get("/image-jobs")
+async def image_jobs_stats():
+    return IMAGE_JOBS.stats()
+
+
+@router.get("/image-jobs/{job_id}")
+async def image_job_status(job_id: str):
+    job = _job_or_404(job_id)
+    return {**job.to_dict(), "position": IMAGE_JOBS.position(job)}
+
+
+@router.get("/image-jobs/{job_id}/result")
+async def image_job_result(job_id: str):
+    job = _job_or_404(job_id)
+    if job.status == "error":
+        raise HTTPException(status_code=502, detail=job.error)
+    if job.status != "done":
+        return JSONResponse(status_code=202, content={**job.to_dict(), "position": IMAGE_JOBS.position(job)})
+    if not images_available(job.results):
+        raise HTTPException(status_code=410, detail=f"images of {job.id} were evicted from the cache, submit the request again")
+    return {**job.to_dict(), "images": [image_url(name) for name in job.results]}
 
 
 @router.post("/generate-image")
-def generate_image(payload: ImageRequest):
+async def generate_image(payload: ImageRequest):
     """
     Generate a figurative image using the current multimodal state
     (art / music / architecture) as conditioning for ComfyUI.
+
+    Goes through the job queue and waits for the result, so repeated
+    clicks on an unchanged state share one render. The image comes back
+    as a URL under /images; inline=True adds it as base64 as well.
     """
-    prompt = build_prompt_from_state(payload.prompt)
-    image_b64 = call_comfyui_api(prompt)
+    job, _ = _submit(payload)
+    await job.done.wait()
+    if job.status == "done" and not images_available(job.results):
+        # evicted between render and now (a busy cache); submitting again
+        # skips the stale job and renders
+        job, _ = _submit(payload)
+        await job.done.wait()
+
+    url = image_b64 = None
+    if job.status == "done" and job.results:
+        url = image_url(job.results[0])
+        if payload.inline:
+            path = IMAGE_CACHE.path(job.results[0])
+            if path is not None:
+                with open(path, "rb") as f:
+                    image_b64 = base64.b64encode(f.read()).decode("utf-8")
 
     return {
-        "prompt": prompt,
+        "prompt": job.prompt,
+        "image_url": url,
         "image_base64": image_b64,
+        "job_id": job.id,
+        "error": job.error,
     }
 
 
+@router.get("/images/{name}")
+def cached_image(name: str):
+    """A rendered PNG. Names are content hashes, so the response never changes."""
+    path = IMAGE_CACHE.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"unknown image: {name}")
+    return FileResponse(path, media_type="image/png", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+@router.get("/image-models")
+def image_models():
+    """Checkpoints ComfyUI reported at the last catalog refresh."""
+    return MODEL_CATALOG.stats()
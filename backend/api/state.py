@@ -1,50 +1,57 @@
-from fastapi import APIRouter
+import time
+from fastapi import APIRouter, Request, Response
 
-from art.runtime import ART_RUNTIME
 from art.engine import ART_STATE
+from backend.orchestrator.state import snapshot
+from backend.orchestrator.wire import encode_payload
 
-from architecture.runtime import ArchitectureRuntime
-from music.runtime import MusicRuntime
-from story.runtime import StoryRuntime
+router = APIRouter()
 
-# instantiate runtimes (singletons)
-ARCH_RUNTIME = ArchitectureRuntime()
-MUSIC_RUNTIME = MusicRuntime()
-STORY_RUNTIME = StoryRuntime()
+# ETags must not repeat across restarts, so they carry the boot time
+_BOOT = f"{int(time.time()):x}"
 
-router = APIRouter()
+# (etag, body) of the last serialized /state, swapped as one tuple so
+# concurrent handlers never pair a tag with another version's body
+_BODY_CACHE = {"current": (None, b"")}
+
+
+def _etag_for(versions):
+    # every publish/touch bumps counters by one, so the sum only grows
+    return f'"{_BOOT}-{sum(versions.values())}"'
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
 
 
 @router.get("/state")
-def get_state():
-    from backend.orchestrator.state import GLOBAL_STATE
-    
-    # Return GLOBAL_STATE directly to match WebSocket broadcast structure
-    # This ensures consistency between REST API and WebSocket updates
-    art_frame = ART_RUNTIME.get_frame()
-    if art_frame:
-        GLOBAL_STATE["art_frame"] = art_frame
-
-    # music + story depend on art output
-    music_frame = MUSIC_RUNTIME.step(art_frame)
-    if music_frame:
-        GLOBAL_STATE["music_frame"] = music_frame
-    
-    # Use existing story_frame from GLOBAL_STATE if available (set by frame_loop initialization)
-    # Otherwise generate a new one
-    if "story_frame" not in GLOBAL_STATE or not GLOBAL_STATE.get("story_frame"):
-        story_frame = STORY_RUNTIME.step(events=[])
-        if story_frame:
-            GLOBAL_STATE["story_frame"] = story_frame
-
-    architecture_frame = ARCH_RUNTIME.step()
-    if architecture_frame:
-        GLOBAL_STATE["architecture"] = architecture_frame
-
-    # Return GLOBAL_STATE structure to match what WebSocket broadcasts
-    return {
-        **GLOBAL_STATE,
-        "meta": {
-            "art_state": ART_STATE
+def get_state(request: Request):
+    """
+    Latest published state, in the same structure the WebSocket broadcasts.
+
+    Read-only: frame_loop steps the runtimes, this never does. The body is
+    serialized once per state version and served as bytes; pollers that
+    send If-None-Match get a 304 with no encoding work at all.
+    """
+    state = snapshot()
+    etag = _etag_for(state["versions"])
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    cached_etag, body = _BODY_CACHE["current"]
+    if cached_etag != etag:
+        body_state = {
+            **state,
+            "meta": {
+                "art_state": ART_STATE
+            }
         }
-    }
\ No newline at end of file
+        body = encode_payload(body_state, "json", state["versions"]).encode("utf-8")
+        _BODY_CACHE["current"] = (etag, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import requests
+import httpx
 import json
 import os
-from backend.orchestrator.frame_loop import STORY_RUNTIME
-from backend.orchestrator.state import GLOBAL_STATE
+from backend.orchestrator.runtimes import STORY_RUNTIME
+from backend.orchestrator.state import publish, snapshot
 from backend.orchestrator.ws_manager import manager
 from story.engine import STORY_STATE
 
@@ -205,14 +207,11 @@ class StoryEnhancementRequest(BaseModel):
     pace: Optional[str] = None
     word_limit: Optional[int] = None
     paragraph_count: Optional[int] = None
+    stream: bool = False
 
 
-def enhance_story_with_llm(story_events, tone="neutral", pace="moderate", mood="neutral", word_limit=500, paragraph_count=5, user_prompt=None, base_story=None):
-    """
-    Use LLM to enhance the story narrative based on events and user intent.
-    Returns paragraphs marked as enhanced.
-    If no events, generates an initial story based on tone/mood/pace.
-    """
+def _build_story_prompt(story_events, tone, pace, mood, word_limit, paragraph_count, base_story=None):
+    """Build the storyteller prompt shared by the blocking and streaming paths."""
     # Build context from story events with agent names (limit to prevent long prompts)
     from story.story_mapper import AGENT_NAMES
     event_summary = []
@@ -321,8 +320,38 @@ Return ONLY valid JSON:
 
 CRITICAL: Write {word_limit} words total. Make the {tone} tone and {mood} mood unmistakable in every sentence!
 """
-    
-    
+    return prompt
+
+
+def _story_request(prompt, word_limit, stream=False):
+    """Groq chat-completions url, headers and payload for a story prompt."""
+    url = "https://api.groq.com/openai/v1/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a creative storyteller who writes detailed, engaging narratives about digital swarm simulations. You MUST return valid JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.8,
+        "max_tokens": word_limit * 3  # Allow enough tokens
+    }
+    if stream:
+        payload["stream"] = True
+    return url, headers, payload
+
+
+def enhance_story_with_llm(story_events, tone="neutral", pace="moderate", mood="neutral", word_limit=500, paragraph_count=5, user_prompt=None, base_story=None):
+    """
+    Use LLM to enhance the story narrative based on events and user intent.
+    Returns paragraphs marked as enhanced.
+    If no events, generates an initial story based on tone/mood/pace.
+    """
+    prompt = _build_story_prompt(story_events, tone, pace, mood, word_limit, paragraph_count, base_story)
+
     # Check if we have API key
     if not GROQ_API_KEY:
         print("⚠️ No GROQ_API_KEY found. Falling back to base story.")
@@ -335,22 +364,7 @@ CRITICAL: Write {word_limit} words total. Make the {tone} tone and {mood} mood u
         return {"paragraphs": constrained}
 
     try:
-        # Groq API endpoint
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": MODEL,
-            "messages": [
-                {"role": "system", "content": "You are a creative storyteller who writes detailed, engaging narratives about digital swarm simulations. You MUST return valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.8,
-            "max_tokens": word_limit * 3  # Allow enough tokens
-        }
+        url, headers, payload = _story_request(prompt, word_limit)
 
         print(f"🚀 Sending request to Groq (Model: {MODEL}, Target: {word_limit} words)...")
         import time
@@ -453,7 +467,8 @@ CRITICAL: Write {word_limit} words total. Make the {tone} tone and {mood} mood u
         else:
              print(f"✨ Keeping story as is ({current_words} words), within acceptable margin of {word_limit}")
                 
-        return {"paragraphs": enhanced_paragraphs}
+        # "llm" tells callers this came from Groq, not one of the fallbacks below
+        return {"paragraphs": enhanced_paragraphs, "llm": True}
         
     except requests.exceptions.Timeout:
         print(f"⚠️ LLM timeout - generating story without LLM enhancement")
@@ -497,10 +512,113 @@ CRITICAL: Write {word_limit} words total. Make the {tone} tone and {mood} mood u
         return {"paragraphs": constrained}
 
 
+# one pooled client for every streamed story, closed on app shutdown
+_GROQ_HTTP = {"client": None}
+
+
+def groq_http():
+    client = _GROQ_HTTP["client"]
+    if client is None or client.is_closed:
+        client = _GROQ_HTTP["client"] = httpx.AsyncClient(timeout=httpx.Timeout(300, connect=10))
+    return client
+
+
+async def close_groq_http():
+    if _GROQ_HTTP["client"] is not None:
+        await _GROQ_HTTP["client"].aclose()
+
+
+class ParagraphStreamParser:
+    """
+    Pull finished paragraph objects out of a JSON document that is still
+    arriving: tracks brace depth outside of strings, and every object that
+    closes is parsed with json.loads, so key order and extra keys don't
+    matter. Objects with a "content" string are paragraphs.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._starts = []  # offsets of the objects still open
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        found = []
+        buffer = self.buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._starts.append(pos)
+            elif char == "}" and self._starts:
+                paragraph = self._paragraph(buffer[self._starts.pop():pos + 1])
+                if paragraph is not None:
+                    found.append(paragraph)
+        self._pos = len(buffer)
+        return found
+
+    @staticmethod
+    def _paragraph(text):
+        try:
+            item = json.loads(text)
+        except ValueError:
+            return None
+        content = item.get("content") if isinstance(item, dict) else None
+        if not isinstance(content, str) or not content.strip():
+            return None
+        return {"type": item.get("type", "paragraph"), "content": content.strip(), "enhanced": True}
+
+
+async def stream_story_with_llm(story_events, tone="neutral", pace="moderate", mood="neutral", word_limit=500, paragraph_count=5, base_story=None, on_paragraph=None):
+    """
+    Streaming variant of enhance_story_with_llm. Tokens are read from
+    Groq's SSE stream and every paragraph is handed to
+    on_paragraph(paragraph, paragraphs_so_far) as soon as its JSON object
+    closes. Raises on HTTP/network errors so the caller can fall back.
+    """
+    prompt = _build_story_prompt(story_events, tone, pace, mood, word_limit, paragraph_count, base_story)
+    url, headers, payload = _story_request(prompt, word_limit, stream=True)
+
+    parser = ParagraphStreamParser()
+    paragraphs = []
+    print(f"🚀 Streaming story from Groq (Model: {MODEL}, Target: {word_limit} words)...")
+    async with groq_http().stream("POST", url, headers=headers, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                token = json.loads(data)["choices"][0]["delta"].get("content") or ""
+            except (ValueError, KeyError, IndexError):
+                continue
+            for paragraph in parser.feed(token):
+                paragraphs.append(paragraph)
+                if on_paragraph is not None:
+                    await on_paragraph(paragraph, paragraphs)
+
+    # same generous trimming as the blocking path
+    current_words = _count_words(" ".join(p["content"] for p in paragraphs if p.get("type") == "paragraph"))
+    if current_words > word_limit * 1.5:
+        paragraphs = _enforce_constraints(paragraphs, word_limit, paragraph_count)
+    return {"paragraphs": paragraphs}
+
+
 @router.get("/story")
 def get_story():
     """Get current story state"""
-    story_frame = GLOBAL_STATE.get("story_frame", {})
+    story_frame = snapshot().get("story_frame", {})
     return story_frame
 
 
@@ -509,7 +627,8 @@ async def generate_story(payload: StoryEnhancementRequest):
     """
     Generate or enhance story using LLM.
     """
-    story_frame = GLOBAL_STATE.get("story_frame", {})
+    # published frames are shared with readers; edit a copy and publish it
+    story_frame = dict(snapshot().get("story_frame", {}))
     story_events = story_frame.get("story_events", [])
     
     # Use provided values or fall back to state/defaults
@@ -538,17 +657,45 @@ async def generate_story(payload: StoryEnhancementRequest):
         # Get base story for context
         base_story = STORY_RUNTIME.generate_full_story()
         
-        # Use LLM to enhance the story
-        enhanced = enhance_story_with_llm(
-            story_events,
-            tone=tone,
-            pace=pace,
-            mood=mood,
-            word_limit=word_limit,
-            paragraph_count=paragraph_count,
-            user_prompt=payload.prompt,
-            base_story=base_story
-        )
+        enhanced = None
+        if payload.stream and GROQ_API_KEY:
+            # show each paragraph as soon as it is generated
+            publish("story_frame", {**story_frame, "paragraphs": [], "enhanced": True, "streaming": True})
+
+            async def push_paragraph(paragraph, paragraphs):
+                publish("story_frame", {**snapshot().get("story_frame", {}), "paragraphs": list(paragraphs)})
+                await manager.broadcast(snapshot())
+
+            try:
+                enhanced = await stream_story_with_llm(
+                    story_events,
+                    tone=tone,
+                    pace=pace,
+                    mood=mood,
+                    word_limit=word_limit,
+                    paragraph_count=paragraph_count,
+                    base_story=base_story,
+                    on_paragraph=push_paragraph
+                )
+                if not enhanced.get("paragraphs"):
+                    enhanced = None
+            except Exception as e:
+                print(f"⚠️ Story streaming failed, falling back to a single request: {e}")
+                enhanced = None
+
+        if enhanced is None:
+            # Use LLM to enhance the story (a blocking request, kept off the event loop)
+            enhanced = await asyncio.to_thread(
+                enhance_story_with_llm,
+                story_events,
+                tone=tone,
+                pace=pace,
+                mood=mood,
+                word_limit=word_limit,
+                paragraph_count=paragraph_count,
+                user_prompt=payload.prompt,
+                base_story=base_story
+            )
         
         # Merge enhanced paragraphs with base story, keeping structure
         # Replace base paragraphs with enhanced ones, but keep headers if they exist
@@ -570,11 +717,11 @@ async def generate_story(payload: StoryEnhancementRequest):
         
         print(f"✅ Story regenerated: {len(enhanced_paragraphs)} paragraphs, tone={tone}, mood={mood}, pace={pace}")
         
-        GLOBAL_STATE["story_frame"] = story_frame
+        publish("story_frame", story_frame)
         
         # Broadcast updated state via WebSocket so frontend receives the update
         try:
-            await manager.broadcast(GLOBAL_STATE)
+            await manager.broadcast(snapshot())
         except Exception as e:
             print(f"⚠️ Could not broadcast story update: {e}")
         
@@ -585,7 +732,7 @@ async def generate_story(payload: StoryEnhancementRequest):
     else:
         # User updated parameters (tone, mood, etc) but didn't request a re-write.
         # Check if we already have an enhanced story.
-        current_frame = GLOBAL_STATE.get("story_frame", {})
+        current_frame = dict(snapshot().get("story_frame", {}))
         if current_frame.get("enhanced") and current_frame.get("paragraphs"):
             print(f"✨ Preserving existing enhanced story while updating metadata")
             # Just update metadata in the existing frame
@@ -596,8 +743,7 @@ async def generate_story(payload: StoryEnhancementRequest):
                 "total_events": len(story_events),
                 "current_frame": current_frame.get("meta", {}).get("current_frame", 0)
             }
-            # Ensure GLOBAL_STATE is updated (it should be ref update, but good to be explicit)
-            GLOBAL_STATE["story_frame"] = current_frame
+            publish("story_frame", current_frame)
         else:
             # No enhanced story, or we want to update the algorithmic story
             full_story = STORY_RUNTIME.generate_full_story()
@@ -609,7 +755,8 @@ async def generate_story(payload: StoryEnhancementRequest):
             if not story_events and (not full_story.get("paragraphs") or len(full_story["paragraphs"]) <= 1):
                 print(f"📝 No events found, generating initial story with tone={tone}, mood={mood}, pace={pace}")
                 # Use LLM to generate an initial story based on tone/mood/pace
-                enhanced = enhance_story_with_llm(
+                enhanced = await asyncio.to_thread(
+                    enhance_story_with_llm,
                     [],  # No events
                     tone=tone,
                     pace=pace,
@@ -621,7 +768,7 @@ async def generate_story(payload: StoryEnhancementRequest):
                 )
                 
                 enhanced_paragraphs = enhanced.get("paragraphs", [])
-                story_frame = GLOBAL_STATE.get("story_frame", {})
+                story_frame = dict(snapshot().get("story_frame", {}))
                 story_frame["paragraphs"] = enhanced_paragraphs
                 story_frame["enhanced"] = True
                 story_frame["story_events"] = story_events
@@ -633,11 +780,11 @@ async def generate_story(payload: StoryEnhancementRequest):
                     "total_events": len(story_events),
                     "current_frame": 0
                 }
-                GLOBAL_STATE["story_frame"] = story_frame
+                publish("story_frame", story_frame)
                 
                 # Return immediately as we've updated the state
                 try:
-                    await manager.broadcast(GLOBAL_STATE)
+                    await manager.broadcast(snapshot())
                 except Exception as e:
                     print(f"⚠️ Could not broadcast story update: {e}")
                 
@@ -652,7 +799,7 @@ async def generate_story(payload: StoryEnhancementRequest):
                 # Fallback if algorithmic generation fails
                 paragraphs = [{"type": "paragraph", "content": "Waiting for events...", "enhanced": False}]
                 
-            story_frame = GLOBAL_STATE.get("story_frame", {})
+            story_frame = dict(snapshot().get("story_frame", {}))
             story_frame["paragraphs"] = paragraphs
             story_frame["story_events"] = full_story.get("story_events", [])
             story_frame["meta"] = {
@@ -662,17 +809,17 @@ async def generate_story(payload: StoryEnhancementRequest):
                 "total_events": len(story_events),
                 "current_frame": STORY_RUNTIME.current_frame
             }
-            GLOBAL_STATE["story_frame"] = story_frame
+            publish("story_frame", story_frame)
         
         # Broadcast updated state via WebSocket
         try:
-            await manager.broadcast(GLOBAL_STATE)
+            await manager.broadcast(snapshot())
         except Exception as e:
             print(f"⚠️ Could not broadcast story update: {e}")
         
         return {
             "status": "ok",
-            "story": GLOBAL_STATE.get("story_frame", {})
+            "story": snapshot().get("story_frame", {})
         }
 
 
@@ -1,20 +1,94 @@
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from backend.orchestrator.ws_manager import manager
-from backend.orchestrator.state import GLOBAL_STATE
+from backend.orchestrator.ws_manager import manager, TOPIC_RATES
+from backend.orchestrator.state import snapshot
+from backend.orchestrator.wire import WIRE_FORMATS
 
 router = APIRouter()
 
+ART_PROTOCOLS = {"full", "delta"}
+
+
+def _valid_topics(topics):
+    if isinstance(topics, dict):
+        return all(
+            isinstance(hz, (int, float)) and not isinstance(hz, bool)
+            for hz in topics.values()
+        )
+    return all(isinstance(topic, str) for topic in topics)
+
+
+async def _handle_client_message(websocket: WebSocket, text: str):
+    """
+    Control messages from the client:
+      {"art_protocol": "delta"}  switch art_frame to keyframe/delta encoding
+      {"resync": true}           request a fresh art keyframe after a seq gap
+      {"format": "msgpack"}      switch to binary MessagePack frames (JSON stays the default)
+      {"subscribe": ["art_frame", "music_frame"]}
+      {"subscribe": {"art_frame": 30, "story_frame": 1}}
+                                 only receive these GLOBAL_STATE sections, at most at
+                                 the given (or default) rate in Hz
+      {"max_fps": 15}            cap this client's frame rate (the server may go lower
+                                 while the client falls behind)
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return
+    if not isinstance(data, dict):
+        return
+
+    fmt = data.get("format")
+    if fmt is not None:
+        if fmt in WIRE_FORMATS:
+            manager.set_option(websocket, "format", fmt)
+        else:
+            await manager.send(websocket, {"error": f"unsupported format: {fmt}", "formats": sorted(WIRE_FORMATS)})
+
+    topics = data.get("subscribe")
+    if isinstance(topics, (list, dict)):
+        if _valid_topics(topics):
+            subscribed = manager.subscribe(websocket, topics)
+            await manager.send(websocket, {"subscribed": subscribed})
+        else:
+            await manager.send(websocket, {
+                "error": "subscribe takes a list of topic names or {topic: hz}",
+                "topics": sorted(TOPIC_RATES)
+            })
+
+    max_fps = data.get("max_fps")
+    if isinstance(max_fps, (int, float)) and not isinstance(max_fps, bool) and max_fps > 0:
+        await manager.send(websocket, {"max_fps": manager.set_max_fps(websocket, max_fps)})
+
+    protocol = data.get("art_protocol")
+    if protocol in ART_PROTOCOLS:
+        manager.set_option(websocket, "art_protocol", protocol)
+        if protocol == "delta":
+            await manager.send_keyframe(websocket, snapshot())
+
+    if data.get("resync"):
+        await manager.send_keyframe(websocket, snapshot())
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
 
     try:
-        await websocket.send_json(GLOBAL_STATE)
+        await manager.send(websocket, snapshot())
         while True:
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            await _handle_client_message(websocket, text)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
     except Exception:
-        manager.disconnect(websocket)
\ No newline at end of file
+        manager.disconnect(websocket)
+
+
+# async: the ConnectionManager is only touched from the event loop
+@router.get("/ws/stats")
+async def websocket_stats():
+    """Per-client send queue depth, drop count and lag, to spot slow consumers."""
+    return {"clients": manager.stats()}
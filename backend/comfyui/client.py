@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import uuid
+
+import httpx
+
+try:
+    import websockets
+except ImportError:  # optional, falls back to polling /history
+    websockets = None
+
+COMFYUI_URL = os.getenv("COMFYUI_URL", "http://127.0.0.1:8188")
+COMFYUI_MAX_CONNECTIONS = int(os.getenv("COMFYUI_MAX_CONNECTIONS", "8"))
+COMFYUI_TIMEOUT_S = float(os.getenv("COMFYUI_TIMEOUT_S", "120"))
+
+HISTORY_POLL_S = 2.0        # only while the progress websocket is down
+SAFETY_POLL_S = 10.0        # cross-check /history even when connected, in case an event was missed
+CONNECT_GRACE_S = 1.0       # wait this long for a fresh websocket before submitting
+MAX_FINISHED_UNCLAIMED = 128
+
+
+class ComfyUIError(Exception):
+    pass
+
+
+class SubmissionError(ComfyUIError):
+    """ComfyUI refused the workflow (e.g. a checkpoint it doesn't have)."""
+
+
+class ComfyUIClient:
+    """
+    Async ComfyUI client: one pooled httpx session for the REST calls and
+    one websocket (registered under our client_id) for execution events.
+
+    A generation waits on the websocket's "executing node=None" event for
+    its prompt_id, so it finishes as soon as ComfyUI does instead of on the
+    next poll. Progress events are handed to the caller's on_progress.
+    Without a websocket it falls back to polling /history.
+    """
+    def __init__(self, base_url=COMFYUI_URL, max_connections=COMFYUI_MAX_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.client_id = uuid.uuid4().hex
+        self.connected = False
+        self._http = None
+        self._listener = None
+        self._waiters = {}      # prompt_id -> Future
+        self._on_progress = {}  # prompt_id -> callback(prompt_id, progress)
+        self._finished = {}     # prompt_id -> error or None, for events that beat their waiter
+
+    # ---- REST ----
+
+    def http(self):
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._http
+
+    async def object_info(self, node_class=None):
+        resp = await self.http().get(f"/object_info/{node_class}" if node_class else "/object_info")
+        resp.raise_for_status()
+        return resp.json()
+
+    async def submit(self, workflow):
+        resp = await self.http().post("/prompt", json={"prompt": workflow, "client_id": self.client_id})
+        if resp.status_code != 200:
+            raise SubmissionError(f"ComfyUI rejected the workflow ({resp.status_code}): {resp.text[:500]}")
+        prompt_id = resp.json().get("prompt_id")
+        if not prompt_id:
+            raise SubmissionError(f"ComfyUI returned no prompt_id: {resp.text[:200]}")
+        return prompt_id
+
+    async def history(self, prompt_id):
+        """History entry for prompt_id, or None while it hasn't finished."""
+        resp = await self.http().get(f"/history/{prompt_id}")
+        if resp.status_code != 200:
+            return None
+        return resp.json().get(prompt_id)
+
+    async def view(self, image):
+        resp = await self.http().get("/view", params={
+            "filename": image.get("filename", ""),
+            "subfolder": image.get("subfolder", ""),
+            "type": image.get("type", "output")
+        })
+        resp.raise_for_status()
+        return resp.content
+
+    async def aclose(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._http is not None:
+            await self._http.aclose()
+
+    # ---- execution events ----
+
+    def _ensure_listener(self):
+        """Start the event listener if it isn't running; True when it was just started."""
+        if websockets is None:
+            return False
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+            return True
+        return False
+
+    async def _listen(self):
+        url = "ws" + self.base_url[len("http"):] + f"/ws?clientId={self.client_id}"
+        delay = 0.5
+        while True:
+            try:
+                async with websockets.connect(url, max_size=None) as ws:
+                    self.connected = True
+                    delay = 0.5
+                    async for raw in ws:
+                        # binary frames are latent previews
+                        if isinstance(raw, str):
+                            self._handle_event(json.loads(raw))
+            except asyncio.CancelledError:
+                self.connected = False
+                raise
+            except Exception as e:
+                if self.connected:
+                    print(f"⚠️ ComfyUI websocket dropped: {e}")
+            self.connected = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+    def _handle_event(self, message):
+        kind = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+
+        if kind == "progress":
+            self._report(prompt_id, {"status": "running", "value": data.get("value"), "max": data.get("max"), "node": data.get("node")})
+        elif kind == "executing":
+            if data.get("node") is None:
+                self._finish(prompt_id, None)
+            else:
+                self._report(prompt_id, {"status": "running", "node": data.get("node")})
+        elif kind == "execution_error":
+            self._finish(prompt_id, ComfyUIError(data.get("exception_message") or "execution error"))
+        elif kind == "execution_interrupted":
+            self._finish(prompt_id, ComfyUIError("execution interrupted"))
+
+    def _report(self, prompt_id, progress):
+        callback = self._on_progress.get(prompt_id)
+        if callback is not None:
+            try:
+                callback(prompt_id, progress)
+            except Exception as e:
+                print(f"⚠️ ComfyUI progress callback failed: {e}")
+
+    def _finish(self, prompt_id, error):
+        waiter = self._waiters.get(prompt_id)
+        if waiter is not None and not waiter.done():
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+            return
+        self._finished[prompt_id] = error
+        while len(self._finished) > MAX_FINISHED_UNCLAIMED:
+            self._finished.pop(next(iter(self._finished)))
+
+    async def _wait_connected(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.connected and websockets is not None and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def wait(self, prompt_id, timeout=COMFYUI_TIMEOUT_S):
+        """Wait until prompt_id has finished; returns its history entry."""
+        if prompt_id in self._finished:
+            error = self._finished.pop(prompt_id)
+            if error is not None:
+                raise error
+            return await self.history(prompt_id)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters[prompt_id] = waiter
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise ComfyUIError(f"timed out after {timeout}s waiting for {prompt_id}")
+                poll = SAFETY_POLL_S if self.connected else HISTORY_POLL_S
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), min(remaining, poll))
+                    return await self.history(prompt_id)
+                except asyncio.TimeoutError:
+                    entry = await self.history(prompt_id)
+                    if entry is not None and entry.get("outputs"):
+                        return entry
+        finally:
+            self._waiters.pop(prompt_id, None)
+            if not waiter.done():
+                waiter.cancel()
+
+    # ---- one call ----
+
+    async def generate(self, workflow, on_progress=None, timeout=COMFYUI_TIMEOUT_S):
+        """
+        Submit a workflow and return (prompt_id, images): the SaveImage
+        outputs from its history entry, each a {"filename", "subfolder",
+        "type"} dict that view() downloads.
+        """
+        # only a listener started just now gets a grace period; an established
+        # one that is reconnecting shouldn't delay every render
+        if self._ensure_listener():
+            await self._wait_connected(CONNECT_GRACE_S)
+
+        prompt_id = await self.submit(workflow)
+        if on_progress is not None:
+            self._on_progress[prompt_id] = on_progress
+            self._report(prompt_id, {"status": "queued"})
+        try:
+            entry = await self.wait(prompt_id, timeout)
+            images = []
+            for output in ((entry or {}).get("outputs") or {}).values():
+                images.extend(output.get("images", []))
+            if not images:
+                raise ComfyUIError(f"no images in the outputs of {prompt_id}")
+            self._report(prompt_id, {"status": "done"})
+            return prompt_id, images
+        except Exception:
+            self._report(prompt_id, {"status": "error"})
+            raise
+        finally:
+            self._on_progress.pop(prompt_id, None)
+
+
+COMFYUI = ComfyUIClient()
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "swarm2creative-images"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# <workflow hash>-<batch index>.png
+_NAME = re.compile(r"^([0-9a-f]{64})-(\d+)\.png$")
+
+
+def workflow_hash(workflow: dict) -> str:
+    """Stable hash of a ComfyUI workflow; equal workflows render equal images."""
+    raw = json.dumps(workflow, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """
+    On-disk PNG cache addressed by workflow hash.
+
+    A workflow that was rendered before (same prompt, model, seed, size,
+    batch) is answered from disk without touching ComfyUI. Files are
+    named <hash>-<index>.png so they can be served directly; total size
+    is capped at max_bytes, evicting the least recently used workflow.
+    Recency survives restarts through the files' mtimes.
+
+    Renders with a random seed are kept only so their URLs work: get()
+    never returns them, and they are evicted before any reusable render.
+    """
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # hash -> [(name, size)], oldest first
+        self.unseeded = OrderedDict()  # same, for renders that can't be looked up again
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):  # write interrupted by a crash
+                os.remove(os.path.join(self.directory, name))
+                continue
+            match = _NAME.match(name)
+            if match:
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, match.group(1), int(match.group(2)), name, stat.st_size))
+        for _, key, _, name, size in sorted(files):
+            self.entries.setdefault(key, []).append((name, size))
+            self.entries.move_to_end(key)
+            self.total_bytes += size
+        for key in self.entries:
+            self.entries[key].sort(key=lambda item: int(_NAME.match(item[0]).group(2)))
+
+    def path(self, name):
+        """Absolute path of a cached image, or None for names that aren't ours."""
+        if not _NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+    def get(self, key):
+        """Image names for a workflow hash, or None."""
+        with self._lock:
+            files = self.entries.get(key)
+            if files is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        for name, _ in files:
+            try:
+                os.utime(os.path.join(self.directory, name))
+            except OSError:
+                # deleted behind our back (e.g. a tmp cleaner): render again
+                self._forget(key)
+                return None
+        return [name for name, _ in files]
+
+    def _forget(self, key):
+        with self._lock:
+            files = self.entries.pop(key, None)
+            if files is not None:
+                self.total_bytes -= sum(size for _, size in files)
+                self.hits -= 1
+                self.misses += 1
+
+    def put(self, key, images, cache=True):
+        """
+        Store one workflow's PNGs and return their names. cache=False is
+        for workflows with a random seed: stored to be served, not reused.
+        """
+        files = []
+        for index, data in enumerate(images):
+            name = f"{key}-{index}.png"
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)  # mkstemp creates 0600
+            os.replace(tmp, os.path.join(self.directory, name))
+            files.append((name, len(data)))
+
+        with self._lock:
+            pool = self.entries if cache else self.unseeded
+            old = pool.pop(key, None)
+            if old:
+                self.total_bytes -= sum(size for _, size in old)
+            pool[key] = files
+            self.total_bytes += sum(size for _, size in files)
+            evicted = []
+            while self.total_bytes > self.max_bytes:
+                # unseeded renders go first; never the workflow just stored
+                if len(self.unseeded) > (0 if cache else 1):
+                    _, old_files = self.unseeded.popitem(last=False)
+                elif len(self.entries) > (1 if cache else 0):
+                    _, old_files = self.entries.popitem(last=False)
+                else:
+                    break
+                self.total_bytes -= sum(size for _, size in old_files)
+                self.evictions += 1
+                evicted.extend(name for name, _ in old_files)
+
+        for name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        return [name for name, _ in files]
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "workflows": len(self.entries),
+            "unseeded": len(self.unseeded),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+IMAGE_CACHE = ImageCache()
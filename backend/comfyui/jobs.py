@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import itertools
+import os
+import time
+from collections import deque
+
+IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE", "16"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_MAX_BATCH = int(os.getenv("IMAGE_MAX_BATCH", "4"))
+JOB_TTL_S = float(os.getenv("IMAGE_JOB_TTL_S", "600"))  # finished jobs kept for /result
+
+_job_ids = itertools.count(1)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ImageJob:
+    def __init__(self, key, prompt, negative_prompt, model, count, fresh=False):
+        self.id = f"img-{next(_job_ids)}-{key[:8]}"
+        self.key = key
+        self.prompt = prompt
+        self.negative_prompt = negative_prompt
+        self.model = model
+        self.count = count
+        self.fresh = fresh
+        self.status = "queued"
+        self.progress = None
+        self.error = None
+        self.results = []       # whatever render() returned for this job's images
+        self.requests = 1       # submissions collapsed into this job
+        self.batch_size = None  # images in the ComfyUI workflow this job ran in
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "prompt": self.prompt,
+            "model": self.model,
+            "count": self.count,
+            "progress": self.progress,
+            "error": self.error,
+            "requests": self.requests,
+            "batch_size": self.batch_size,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+def job_key(prompt, negative_prompt, model, count):
+    raw = "\x1f".join([prompt, negative_prompt or "", model or "", str(count)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ImageJobQueue:
+    """
+    Bounded queue of image jobs in front of ComfyUI.
+
+    Submitting the same prompt/model/count again while a job for it is
+    queued, running or finished (within JOB_TTL_S) returns that job, so
+    repeated clicks on an unchanged state cost one render. fresh=True
+    asks for new variations instead; fresh jobs for the same prompt that
+    wait in the queue together are rendered as one workflow with
+    batch_size > 1 and the images split back per job.
+
+    render(prompt, negative_prompt, model, batch_size, on_progress, fresh)
+    does the actual work and returns one result per image; fresh is True
+    when any job in the batch asked for new variations. on_update(job) is
+    called whenever a job's status or progress changes. results_valid(results)
+    says whether a finished job's results can still be handed out; a
+    finished job whose results aren't is dropped instead of deduped to.
+    """
+    def __init__(self, render, on_update=None, maxsize=IMAGE_QUEUE_SIZE, workers=IMAGE_WORKERS, max_batch=IMAGE_MAX_BATCH, results_valid=None):
+        self.render = render
+        self.on_update = on_update
+        self.results_valid = results_valid
+        self.maxsize = maxsize
+        self.workers = workers
+        self.max_batch = max_batch
+        self.jobs = {}
+        self.pending = deque()
+        self._by_key = {}
+        self._ready = None
+        self._tasks = []
+        self.busy = 0           # workers currently rendering a batch
+        self.deduped = 0
+        self.batched = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, prompt, negative_prompt="", model=None, count=1, fresh=False):
+        """(job, deduped). Raises QueueFull when the queue is at capacity."""
+        self._expire()
+        count = max(1, min(int(count), self.max_batch))
+        key = job_key(prompt, negative_prompt, model, count)
+
+        if not fresh:
+            existing = self.jobs.get(self._by_key.get(key))
+            if existing is not None and existing.status == "done" and not self._valid(existing):
+                self._drop(existing)
+                existing = None
+            if existing is not None and existing.status != "error":
+                existing.requests += 1
+                self.deduped += 1
+                return existing, True
+
+        if len(self.pending) >= self.maxsize:
+            raise QueueFull(f"{len(self.pending)} image jobs already queued")
+
+        job = ImageJob(key, prompt, negative_prompt, model, count, fresh)
+        self.jobs[job.id] = job
+        self._by_key[key] = job.id
+        self.pending.append(job)
+        if self._ready is not None:
+            self._ready.set()
+        return job, False
+
+    def _updated(self, batch):
+        if self.on_update is None:
+            return
+        for job in batch:
+            try:
+                self.on_update(job)
+            except Exception as e:
+                print(f"⚠️ Image job update hook failed: {e}")
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def position(self, job):
+        try:
+            return self.pending.index(job)
+        except ValueError:
+            return None
+
+    def _valid(self, job):
+        return self.results_valid is None or self.results_valid(job.results)
+
+    def _drop(self, job):
+        self.jobs.pop(job.id, None)
+        if self._by_key.get(job.key) == job.id:
+            del self._by_key[job.key]
+
+    def _expire(self):
+        cutoff = time.time() - JOB_TTL_S
+        for job in [j for j in self.jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            self._drop(job)
+
+    def _take_batch(self):
+        first = self.pending.popleft()
+        batch = [first]
+        total = first.count
+        for job in list(self.pending):
+            if total + job.count > self.max_batch:
+                continue
+            # one workflow = one prompt; only the latent batch size grows
+            if (job.prompt, job.negative_prompt, job.model) == (first.prompt, first.negative_prompt, first.model):
+                self.pending.remove(job)
+                batch.append(job)
+                total += job.count
+        return batch, total
+
+    async def _worker(self):
+        while True:
+            while not self.pending:
+                self._ready.clear()
+                await self._ready.wait()
+            batch, total = self._take_batch()
+            if len(batch) > 1:
+                self.batched += len(batch) - 1
+
+            for job in batch:
+                job.status = "running"
+                job.batch_size = total
+            self._updated(batch)
+
+            def on_progress(progress, batch=batch):
+                for job in batch:
+                    job.progress = progress
+                self._updated(batch)
+
+            first = batch[0]
+            self.busy += 1
+            try:
+                fresh = any(job.fresh for job in batch)
+                results = await self.render(first.prompt, first.negative_prompt, first.model, total, on_progress, fresh)
+                if len(results) < total:
+                    raise RuntimeError(f"expected {total} images, got {len(results)}")
+                offset = 0
+                for job in batch:
+                    job.results = results[offset:offset + job.count]
+                    offset += job.count
+                    job.status = "done"
+            except Exception as e:
+                print(f"⚠️ Image job failed: {e}")
+                for job in batch:
+                    job.status = "error"
+                    job.error = str(e)
+            finally:
+                self.busy -= 1
+                for job in batch:
+                    job.finished_at = time.time()
+                    job.done.set()
+                self._updated(batch)
+
+    def stats(self):
+        return {
+            "queued": len(self.pending),
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "busy": self.busy,
+            "running": sum(1 for j in self.jobs.values() if j.status == "running"),
+            "jobs": len(self.jobs),
+            "deduped": self.deduped,
+            "batched": self.batched
+        }
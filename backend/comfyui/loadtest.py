@@ -0,0 +1,188 @@
+"""
+Load test for POST /generate-image.
+
+Runs --users concurrent clients against a running backend (point its
+COMFYUI_URL at backend.comfyui.stub_server to test without a GPU) and
+reports throughput, latency percentiles and how often the image worker
+pool was exhausted, sampled from GET /image-jobs while the test runs.
+
+    python -m backend.comfyui.stub_server --latency 1.5 &
+    COMFYUI_URL=http://127.0.0.1:8188 uvicorn backend.main:app --port 8000 &
+    python -m backend.comfyui.loadtest --users 16 --requests 200 --unique 1.0
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import httpx
+
+SAMPLE_INTERVAL_S = 0.25
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _body(args):
+    body = {"fresh": random.random() < args.fresh}
+    # a prompt nobody asked for before defeats job dedupe and the image cache
+    if random.random() < args.unique:
+        body["prompt"] = f"load test {uuid.uuid4().hex[:12]}"
+    return body
+
+
+async def _user(client, args, deadline, budget, results):
+    while time.monotonic() < deadline and budget["left"] > 0:
+        budget["left"] -= 1
+        started = time.monotonic()
+        try:
+            resp = await client.post("/generate-image", json=_body(args))
+            elapsed = time.monotonic() - started
+            if resp.status_code == 200:
+                data = resp.json()
+                outcome = "ok" if data.get("image_url") else "failed"
+            elif resp.status_code == 429:
+                outcome = "queue_full"
+            else:
+                outcome = f"http_{resp.status_code}"
+        except httpx.TimeoutException:
+            elapsed, outcome = time.monotonic() - started, "timeout"
+        except httpx.HTTPError as e:
+            elapsed, outcome = time.monotonic() - started, type(e).__name__
+        results.append((outcome, elapsed))
+        if args.think > 0:
+            await asyncio.sleep(random.uniform(0, 2 * args.think))
+
+
+async def _sample(client, samples, stop):
+    while not stop.is_set():
+        try:
+            resp = await client.get("/image-jobs")
+            if resp.status_code == 200:
+                samples.append(resp.json())
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL_S)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _image_cache(client):
+    try:
+        return (await client.get("/metrics")).json().get("image_cache") or {}
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.users + 2)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        cache_before = await _image_cache(client)
+        results, samples = [], []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample(client, samples, stop))
+
+        started = time.monotonic()
+        deadline = started + args.duration if args.duration else float("inf")
+        budget = {"left": args.requests if args.requests else float("inf")}
+        await asyncio.gather(*(_user(client, args, deadline, budget, results) for _ in range(args.users)))
+        wall = time.monotonic() - started
+
+        stop.set()
+        await sampler
+        cache_after = await _image_cache(client)
+
+    return report(args, results, samples, wall, cache_before, cache_after)
+
+
+def report(args, results, samples, wall, cache_before, cache_after):
+    outcomes = {}
+    for outcome, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    ok = [elapsed for outcome, elapsed in results if outcome == "ok"]
+    every = [elapsed for _, elapsed in results]
+
+    def latency(values):
+        return {
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else None
+        }
+
+    saturated = [s for s in samples if s.get("busy", s.get("running", 0)) >= s.get("workers", 1)]
+    full = [s for s in samples if s.get("queued", 0) >= s.get("maxsize", float("inf"))]
+    return {
+        "users": args.users,
+        "requests": len(results),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "outcomes": outcomes,
+        "latency_ok_s": latency(ok),
+        "latency_all_s": latency(every),
+        "worker_pool": {
+            "workers": samples[-1].get("workers") if samples else None,
+            "queue_maxsize": samples[-1].get("maxsize") if samples else None,
+            "samples": len(samples),
+            # share of the run every image worker was busy
+            "saturated_fraction": round(len(saturated) / len(samples), 3) if samples else None,
+            "queue_full_fraction": round(len(full) / len(samples), 3) if samples else None,
+            "max_queued": max((s.get("queued", 0) for s in samples), default=None),
+            "deduped": samples[-1].get("deduped") if samples else None,
+            "batched": samples[-1].get("batched") if samples else None
+        },
+        "image_cache_hits": cache_after.get("hits", 0) - cache_before.get("hits", 0)
+    }
+
+
+def _print(result):
+    def fmt(value):
+        return "-" if value is None else f"{value * 1000:.0f}ms"
+
+    pool = result["worker_pool"]
+    print(f"👥 {result['users']} users, {result['requests']} requests in {result['wall_s']}s")
+    print(f"🚀 throughput: {result['throughput_rps']} images/s")
+    print(f"📊 outcomes: {result['outcomes']}")
+    for name in ("latency_ok_s", "latency_all_s"):
+        lat = result[name]
+        print(f"⏱️ {name[:-2]}: p50 {fmt(lat['p50'])}  p90 {fmt(lat['p90'])}  p99 {fmt(lat['p99'])}  max {fmt(lat['max'])}")
+    print(
+        f"🔧 workers: {pool['workers']}, saturated {pool['saturated_fraction']} of the run, "
+        f"queue full {pool['queue_full_fraction']}, max queued {pool['max_queued']}/{pool['queue_maxsize']}, "
+        f"deduped {pool['deduped']}, batched {pool['batched']}"
+    )
+    print(f"💾 image cache hits: {result['image_cache_hits']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /generate-image")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="backend base URL")
+    parser.add_argument("--users", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=None, help="total requests (default 100 without --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds (0 = until --requests)")
+    parser.add_argument("--think", type=float, default=0, help="mean seconds a user waits between requests")
+    parser.add_argument("--unique", type=float, default=1.0, help="fraction of requests with a never-seen prompt")
+    parser.add_argument("--fresh", type=float, default=0.0, help="fraction of requests sent with fresh=true")
+    parser.add_argument("--timeout", type=float, default=300, help="per-request timeout in seconds")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    if args.requests is None and not args.duration:
+        args.requests = 100
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print(result)
+
+
+if __name__ == "__main__":
+    main()
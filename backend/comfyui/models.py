@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+
+from backend.comfyui.client import COMFYUI
+
+DEFAULT_MODEL = "sd_xl_base_1.0.safetensors"
+MODEL_CATALOG_TTL_S = float(os.getenv("COMFYUI_MODELS_TTL_S", "600"))
+RETRY_AFTER_FAILURE_S = 30.0
+
+
+def checkpoint_names(object_info: dict) -> list:
+    """Checkpoint names in an /object_info response, in ComfyUI's order."""
+    # ComfyUI returns model list in different formats
+    checkpoint_info = object_info.get("CheckpointLoaderSimple", {})
+    ckpt_name_info = checkpoint_info.get("input", {}).get("required", {}).get("ckpt_name", [])
+    if isinstance(ckpt_name_info, list) and len(ckpt_name_info) > 0:
+        # Usually it's a list of strings
+        if isinstance(ckpt_name_info[0], str):
+            return list(ckpt_name_info)
+        elif isinstance(ckpt_name_info[0], list):
+            return list(ckpt_name_info[0])
+    return []
+
+
+class ModelCatalog:
+    """
+    Checkpoint names ComfyUI can load, fetched off the request path.
+
+    run() loads the list at startup and refreshes it every ttl_s; a failed
+    submission calls invalidate() so the next refresh happens right away.
+    choose() never waits on ComfyUI: until the first load succeeds it
+    falls back to DEFAULT_MODEL.
+    """
+    def __init__(self, client=COMFYUI, ttl_s=MODEL_CATALOG_TTL_S):
+        self.client = client
+        self.ttl_s = ttl_s
+        self.models = []
+        self.loaded_at = None
+        self.refreshes = 0
+        self.failures = 0
+        self._wake = None
+        self._task = None
+
+    async def refresh(self):
+        try:
+            # the per-node endpoint is a fraction of the full /object_info
+            try:
+                info = await self.client.object_info("CheckpointLoaderSimple")
+            except Exception:
+                info = await self.client.object_info()
+            self.models = checkpoint_names(info)
+            self.loaded_at = time.time()
+            self.refreshes += 1
+            print(f"📦 ComfyUI models: {self.models}")
+            return True
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ Could not fetch available models: {e}")
+            return False
+
+    async def run(self):
+        self._wake = asyncio.Event()
+        while True:
+            ok = await self.refresh()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.ttl_s if ok else RETRY_AFTER_FAILURE_S)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def invalidate(self):
+        self.loaded_at = None
+        if self._wake is not None:
+            self._wake.set()
+
+    def choose(self, pinned=None):
+        """Model for the next workflow: the pinned one, else the first ComfyUI lists."""
+        if pinned:
+            return pinned
+        return self.models[0] if self.models else DEFAULT_MODEL
+
+    def knows(self, name):
+        # before the first load we can't tell, so let ComfyUI decide
+        return not self.models or name in self.models
+
+    def stats(self):
+        return {
+            "models": self.models,
+            "default": self.choose(),
+            "loaded_at": self.loaded_at,
+            "ttl_s": self.ttl_s,
+            "refreshes": self.refreshes,
+            "failures": self.failures
+        }
+
+
+MODEL_CATALOG = ModelCatalog()
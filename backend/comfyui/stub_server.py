@@ -0,0 +1,260 @@
+"""
+Local stand-in for ComfyUI, for benchmarking the image pipeline without a GPU.
+
+Implements the parts of ComfyUI's API the backend uses: POST /prompt,
+GET /history/{id}, GET /queue, GET /view, GET /object_info[/{node}] and
+the /ws execution events. Prompts run one at a time like on a single
+GPU, taking STUB_LATENCY_S (+- STUB_JITTER) per image in the batch.
+
+    python -m backend.comfyui.stub_server --port 8188 --latency 2 --fail-rate 0.05
+    COMFYUI_URL=http://127.0.0.1:8188 uvicorn backend.main:app --port 8000
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import struct
+import time
+import uuid
+import zlib
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+
+STUB = {
+    "latency_s": float(os.getenv("STUB_LATENCY_S", "2.0")),         # render time per image
+    "jitter": float(os.getenv("STUB_JITTER", "0.2")),               # +- fraction of latency_s
+    "http_latency_s": float(os.getenv("STUB_HTTP_LATENCY_S", "0")), # added to every REST call
+    "steps": int(os.getenv("STUB_STEPS", "10")),                    # progress events per prompt
+    "fail_rate": float(os.getenv("STUB_FAIL_RATE", "0")),           # execution_error after queueing
+    "reject_rate": float(os.getenv("STUB_REJECT_RATE", "0")),       # 400 from /prompt
+    "models": os.getenv("STUB_MODELS", "sd_xl_base_1.0.safetensors").split(","),
+    "image_size": int(os.getenv("STUB_IMAGE_SIZE", "64"))           # PNG edge in pixels
+}
+
+MAX_HISTORY = 1000
+
+app = FastAPI(title="ComfyUI stub")
+
+_numbers = itertools.count()
+QUEUE = []      # [number, prompt_id, workflow, client_id], waiting
+RUNNING = {}    # the entry being executed, if any
+HISTORY = {}    # prompt_id -> history entry
+SOCKETS = {}    # client_id -> WebSocket
+_ready = {}
+
+
+def png(seed: str, size: int) -> bytes:
+    """A solid-colour PNG; the colour comes from seed so images differ per prompt."""
+    color = hashlib.sha256(seed.encode("utf-8")).digest()[:3]
+    raw = b"".join(b"\x00" + color * size for _ in range(size))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+async def _delay():
+    if STUB["http_latency_s"] > 0:
+        await asyncio.sleep(STUB["http_latency_s"])
+
+
+async def _send(client_id, kind, data):
+    ws = SOCKETS.get(client_id)
+    if ws is None:
+        return
+    try:
+        await ws.send_text(json.dumps({"type": kind, "data": data}))
+    except Exception:
+        SOCKETS.pop(client_id, None)
+
+
+def _batch_size(workflow):
+    for node in workflow.values():
+        if node.get("class_type") == "EmptyLatentImage":
+            return int(node.get("inputs", {}).get("batch_size", 1))
+    return 1
+
+
+async def _execute(number, prompt_id, workflow, client_id):
+    batch = _batch_size(workflow)
+    jitter = 1 + random.uniform(-STUB["jitter"], STUB["jitter"])
+    duration = max(0.0, STUB["latency_s"] * batch * jitter)
+    steps = max(1, STUB["steps"])
+    started = time.time()
+
+    await _send(client_id, "execution_start", {"prompt_id": prompt_id})
+    fail_at = random.randrange(steps) if random.random() < STUB["fail_rate"] else None
+    for step in range(steps):
+        await asyncio.sleep(duration / steps)
+        if step == fail_at:
+            HISTORY[prompt_id] = {
+                "prompt": [number, prompt_id, workflow, {}, ["7"]],
+                "outputs": {},
+                "status": {"status_str": "error", "completed": False, "messages": []}
+            }
+            await _send(client_id, "execution_error", {
+                "prompt_id": prompt_id, "node_id": "5", "node_type": "KSampler",
+                "exception_message": "stub: injected failure"
+            })
+            return
+        await _send(client_id, "progress", {"value": step + 1, "max": steps, "prompt_id": prompt_id, "node": "5"})
+
+    images = [{"filename": f"stub_{prompt_id}_{i:05d}_.png", "subfolder": "", "type": "output"} for i in range(batch)]
+    HISTORY[prompt_id] = {
+        "prompt": [number, prompt_id, workflow, {}, ["7"]],
+        "outputs": {"7": {"images": images}},
+        "status": {"status_str": "success", "completed": True, "messages": [], "duration_s": round(time.time() - started, 3)}
+    }
+    while len(HISTORY) > MAX_HISTORY:
+        HISTORY.pop(next(iter(HISTORY)))
+    await _send(client_id, "executing", {"node": None, "prompt_id": prompt_id})
+
+
+async def _executor():
+    # one prompt at a time, in submission order, like a single-GPU ComfyUI
+    while True:
+        while not QUEUE:
+            _ready["event"].clear()
+            await _ready["event"].wait()
+        entry = QUEUE.pop(0)
+        RUNNING["entry"] = entry
+        try:
+            await _execute(*entry)
+        except Exception as e:
+            print(f"⚠️ Stub execution failed: {e}")
+        finally:
+            RUNNING.pop("entry", None)
+
+
+@app.on_event("startup")
+async def start_executor():
+    _ready["event"] = asyncio.Event()
+    asyncio.create_task(_executor())
+
+
+@app.post("/prompt")
+async def prompt(request: Request):
+    await _delay()
+    body = await request.json()
+    workflow = body.get("prompt") or {}
+
+    if random.random() < STUB["reject_rate"]:
+        return JSONResponse(status_code=400, content={"error": {"type": "stub_rejected", "message": "stub: injected rejection"}, "node_errors": {}})
+    for node_id, node in workflow.items():
+        ckpt = node.get("inputs", {}).get("ckpt_name")
+        if node.get("class_type") == "CheckpointLoaderSimple" and ckpt not in STUB["models"]:
+            return JSONResponse(status_code=400, content={
+                "error": {"type": "prompt_outputs_failed_validation", "message": "Prompt outputs failed validation"},
+                "node_errors": {node_id: {"errors": [{"type": "value_not_in_list", "message": f"ckpt_name: '{ckpt}' not in list"}]}}
+            })
+
+    prompt_id = uuid.uuid4().hex
+    number = next(_numbers)
+    QUEUE.append([number, prompt_id, workflow, body.get("client_id")])
+    _ready["event"].set()
+    return {"prompt_id": prompt_id, "number": number, "node_errors": {}}
+
+
+@app.get("/history")
+async def history_all():
+    await _delay()
+    return HISTORY
+
+
+@app.get("/history/{prompt_id}")
+async def history(prompt_id: str):
+    await _delay()
+    return {prompt_id: HISTORY[prompt_id]} if prompt_id in HISTORY else {}
+
+
+@app.get("/queue")
+async def queue():
+    await _delay()
+    running = [RUNNING["entry"][:3]] if "entry" in RUNNING else []
+    return {"queue_running": running, "queue_pending": [entry[:3] for entry in QUEUE]}
+
+
+@app.get("/view")
+async def view(filename: str, subfolder: str = "", type: str = "output"):
+    await _delay()
+    if not filename.startswith("stub_"):
+        return Response(status_code=404)
+    return Response(png(filename, STUB["image_size"]), media_type="image/png")
+
+
+def _object_info():
+    return {
+        "CheckpointLoaderSimple": {
+            "input": {"required": {"ckpt_name": [list(STUB["models"])]}},
+            "output": ["MODEL", "CLIP", "VAE"],
+            "name": "CheckpointLoaderSimple",
+            "category": "loaders"
+        }
+    }
+
+
+@app.get("/object_info")
+async def object_info():
+    await _delay()
+    return _object_info()
+
+
+@app.get("/object_info/{node_class}")
+async def object_info_node(node_class: str):
+    await _delay()
+    info = _object_info()
+    return {node_class: info[node_class]} if node_class in info else {}
+
+
+@app.websocket("/ws")
+async def ws(websocket: WebSocket):
+    await websocket.accept()
+    client_id = websocket.query_params.get("clientId") or uuid.uuid4().hex
+    SOCKETS[client_id] = websocket
+    await websocket.send_text(json.dumps({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": len(QUEUE)}}, "sid": client_id}}))
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if SOCKETS.get(client_id) is websocket:
+            del SOCKETS[client_id]
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="ComfyUI stand-in for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--latency", type=float, default=STUB["latency_s"], help="render seconds per image")
+    parser.add_argument("--jitter", type=float, default=STUB["jitter"], help="+- fraction of --latency")
+    parser.add_argument("--http-latency", type=float, default=STUB["http_latency_s"], help="seconds added to every REST call")
+    parser.add_argument("--steps", type=int, default=STUB["steps"], help="progress events per prompt")
+    parser.add_argument("--fail-rate", type=float, default=STUB["fail_rate"], help="fraction of prompts that end in execution_error")
+    parser.add_argument("--reject-rate", type=float, default=STUB["reject_rate"], help="fraction of /prompt calls answered with 400")
+    parser.add_argument("--models", default=",".join(STUB["models"]), help="comma-separated checkpoint names")
+    args = parser.parse_args()
+
+    STUB.update(
+        latency_s=args.latency,
+        jitter=args.jitter,
+        http_latency_s=args.http_latency,
+        steps=args.steps,
+        fail_rate=args.fail_rate,
+        reject_rate=args.reject_rate,
+        models=args.models.split(",")
+    )
+    print(f"🧪 ComfyUI stub on {args.host}:{args.port}: {STUB}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
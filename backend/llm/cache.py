@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(text: str) -> str:
+    """Case, whitespace and trailing punctuation don't change what a prompt means."""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip(" .!?")
+
+
+class PromptCache:
+    """
+    Bounded LRU of interpreted intents with a TTL, keyed on the normalized
+    prompt plus the model that produced it. Optionally mirrored to a JSON
+    file so a restart doesn't throw away warm entries.
+    """
+    def __init__(self, max_entries=256, ttl_s=3600, path=None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, intent)
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    @staticmethod
+    def key(text, model):
+        return f"{model}\n{normalize_prompt(text)}"
+
+    def get(self, text, model):
+        key = self.key(text, model)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_s:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # callers may keep or tweak the dict, so hand out a fresh copy
+            return json.loads(entry[1])
+
+    def put(self, text, model, intent):
+        key = self.key(text, model)
+        with self._lock:
+            self._entries[key] = (time.time(), json.dumps(intent))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None
+            }
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, stored_at, intent in raw:
+            if now - stored_at <= self.ttl_s:
+                self._entries[key] = (stored_at, intent)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump([[k, t, v] for k, (t, v) in self._entries.items()], f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not persist prompt cache: {e}")
@@ -4,6 +4,8 @@ import os
 from groq import Groq
 from dotenv import load_dotenv
 from backend.llm.prompt import PROMPT_TEMPLATE
+from backend.llm.cache import PromptCache
+from backend.llm.rules import interpret_locally
 
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -17,6 +19,12 @@ if not GROQ_API_KEY:
 
 client = Groq(api_key=GROQ_API_KEY)
 
+PROMPT_CACHE = PromptCache(
+    max_entries=int(os.getenv("PROMPT_CACHE_SIZE", "256")),
+    ttl_s=float(os.getenv("PROMPT_CACHE_TTL_S", "3600")),
+    path=os.getenv("PROMPT_CACHE_FILE") or None
+)
+
 
 def _extract_json(text: str):
     """Extract JSON object from text response"""
@@ -26,6 +34,14 @@ def _extract_json(text: str):
     return match.group(0)
 
 
+def interpret_without_llm(user_text: str):
+    """Intent from the keyword rules or PROMPT_CACHE, or None if Groq has to be asked."""
+    local = interpret_locally(user_text)
+    if local is not None:
+        return local
+    return PROMPT_CACHE.get(user_text, GROQ_MODEL)
+
+
 def interpret_prompt(user_text: str):
     """
     Interpret user text prompt using Groq LLM.
@@ -36,6 +52,14 @@ def interpret_prompt(user_text: str):
     Returns:
         dict: Parsed intent containing art, music, architecture, story parameters
     """
+    known = interpret_without_llm(user_text)
+    if known is not None:
+        return known
+    return interpret_with_groq(user_text)
+
+
+def interpret_with_groq(user_text: str):
+    """The Groq call behind interpret_prompt; successful answers go into PROMPT_CACHE."""
     prompt = PROMPT_TEMPLATE.replace("{input}", user_text)
 
     try:
@@ -64,7 +88,11 @@ def interpret_prompt(user_text: str):
         json_str = _extract_json(raw_output)
         parsed = json.loads(json_str)
 
-        return parsed if isinstance(parsed, dict) else {}
+        if not isinstance(parsed, dict):
+            return {}
+        if parsed:
+            PROMPT_CACHE.put(user_text, GROQ_MODEL, parsed)
+        return parsed
 
     except Exception as e:
         print(f"⚠️ Groq error: {e}")
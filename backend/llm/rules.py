@@ -0,0 +1,132 @@
+import re
+
+from backend.schema.params import ART_EMOTIONS, ART_PATTERNS, MUSIC_TEMPO_SHIFTS, STORY_TONES
+
+# prompts at or above this confidence skip the LLM entirely
+FAST_PATH_MIN_CONFIDENCE = 0.8
+
+EXACT_CONFIDENCE = 0.9
+HEDGED_CONFIDENCE = 0.6
+
+# words that carry no intent of their own
+FILLER = {
+    "a", "an", "the", "it", "make", "be", "more", "much", "please", "now",
+    "go", "get", "let", "lets", "lot", "very", "way", "and",
+    "set", "to", "feel", "feeling", "mood", "style", "tone", "pattern",
+}
+# hedges drop confidence below the fast-path threshold so the LLM decides
+HEDGES = {"maybe", "kinda", "kind", "sort", "of", "perhaps", "somewhat", "bit", "little"}
+
+COMPARATIVES = {
+    "calmer": "calm",
+    "darker": "dark",
+    "warmer": "warm",
+    "tenser": "tense",
+}
+
+# ART_PATTERNS -> controller art keys
+PATTERN_UPDATES = {
+    "organic": {"art_mode": "freeform"},
+    "geometric": {"art_mode": "geometric"},
+    "spiral": {"shape": "spiral"},
+}
+SHAPES = {"ring", "spiral", "petal", "constellation", "vortex", "orbit", "rays"}
+ART_MODES = {"freeform", "geometric", "mandala"}
+
+# MUSIC_TEMPO_SHIFTS -> BPM deltas (outside 60-200 so the controller adds them)
+TEMPO_DELTAS = {
+    "slower": -20,
+    "slightly slower": -10,
+    "faster": 20,
+    "slightly faster": 10,
+}
+
+MUSIC_COMMANDS = {
+    "play music": True,
+    "start music": True,
+    "enable music": True,
+    "stop music": False,
+    "mute music": False,
+}
+
+
+def _tokens(text):
+    text = text.lower().replace("_", " ")
+    return re.findall(r"[a-z]+", text)
+
+
+def _phrase_rules():
+    """(token tuple, handler) pairs, longest phrases first."""
+    rules = []
+    for phrase, enabled in MUSIC_COMMANDS.items():
+        rules.append((tuple(phrase.split()), ("music_toggle", enabled)))
+    for shift in MUSIC_TEMPO_SHIFTS:
+        phrase = shift.replace("_", " ")
+        rules.append((tuple(phrase.split()), ("tempo", TEMPO_DELTAS[phrase])))
+    for emotion in ART_EMOTIONS:
+        rules.append(((emotion,), ("emotion", emotion)))
+    for word, emotion in COMPARATIVES.items():
+        if emotion in ART_EMOTIONS:
+            rules.append(((word,), ("emotion", emotion)))
+    for pattern in ART_PATTERNS:
+        if pattern in PATTERN_UPDATES:
+            rules.append(((pattern,), ("art", PATTERN_UPDATES[pattern])))
+    for shape in SHAPES:
+        rules.append(((shape,), ("art", {"shape": shape})))
+    for mode in ART_MODES:
+        rules.append(((mode,), ("art", {"art_mode": mode})))
+    for tone in STORY_TONES:
+        rules.append(((tone,), ("tone", tone)))
+    rules.sort(key=lambda rule: -len(rule[0]))
+    return rules
+
+
+PHRASE_RULES = _phrase_rules()
+
+
+def interpret_locally(user_text: str):
+    """
+    Deterministic interpreter for prompts made only of known vocabulary
+    ("calmer", "faster", "spiral", "stop music", ...). Returns an intent
+    dict shaped like interpret_prompt's, or None when any word is unknown
+    or the prompt is hedged, so the caller falls back to the LLM.
+    """
+    tokens = _tokens(user_text)
+    if not tokens:
+        return None
+
+    intent = {"art": {}, "music": {}, "architecture": {}, "story": {}}
+    confidence = EXACT_CONFIDENCE
+    matched = False
+    i = 0
+    while i < len(tokens):
+        for phrase, (kind, value) in PHRASE_RULES:
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                break
+        else:
+            word = tokens[i]
+            if word in HEDGES:
+                confidence = HEDGED_CONFIDENCE
+            elif word not in FILLER:
+                return None
+            i += 1
+            continue
+
+        matched = True
+        i += len(phrase)
+        if kind == "emotion":
+            intent["art"]["emotion"] = {"value": value, "confidence": confidence}
+        elif kind == "art":
+            for key, v in value.items():
+                intent["art"][key] = {"value": v, "confidence": confidence}
+        elif kind == "tempo":
+            intent["music"]["tempo_shift"] = {"value": value, "confidence": confidence}
+        elif kind == "music_toggle":
+            intent["music"]["melody_enabled"] = {"value": value, "confidence": 1.0}
+            intent["music"]["bass_enabled"] = {"value": value, "confidence": 1.0}
+        elif kind == "tone":
+            intent["story"]["tone"] = {"value": value, "confidence": confidence}
+
+    if not matched or confidence < FAST_PATH_MIN_CONFIDENCE:
+        return None
+    return intent
@@ -1,17 +1,23 @@
 import sys
 import os
+import asyncio
 import threading
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.api.chat import router as chat_router
 from backend.api.ws import router as ws_router
-from backend.api.image import router as image_router
-from backend.api.story import router as story_router
-from backend.orchestrator.frame_loop import frame_loop
-from art.runtime import ART_RUNTIME
+from backend.api.image import router as image_router, IMAGE_JOBS
+from backend.api.story import router as story_router, close_groq_http
+from backend.orchestrator.frame_loop import frame_loop, LOOP_METRICS
+from backend.orchestrator.runtimes import start_runtimes
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from backend.api.state import router as state_router
+from backend.llm.interpreter import PROMPT_CACHE
+from backend.utils.scheduler import LOOPS
+from backend.comfyui.client import COMFYUI
+from backend.comfyui.models import MODEL_CATALOG
+from backend.comfyui.image_cache import IMAGE_CACHE
 
 app = FastAPI(title="Swarm2Creative Backend")
 
@@ -34,14 +40,32 @@ app.include_router(image_router)
 app.include_router(story_router)
 
 @app.on_event("startup")
-def start_background_loops():
-    ART_RUNTIME.start()
+async def start_background_loops():
+    start_runtimes()
+    MODEL_CATALOG.start()
+    IMAGE_JOBS.start()
 
     threading.Thread(
         target=frame_loop,
+        args=(asyncio.get_running_loop(),),
         daemon=True
     ).start()
 
+@app.on_event("shutdown")
+async def close_clients():
+    await COMFYUI.aclose()
+    await close_groq_http()
+
 @app.get("/")
 def health():
-    return {"status": "swarm backend running"}
\ No newline at end of file
+    return {"status": "swarm backend running"}
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "frame_loop": LOOP_METRICS,
+        # target vs actual tick rate of the art simulation and frame loop
+        "loops": {name: loop.stats() for name, loop in LOOPS.items()},
+        "prompt_cache": PROMPT_CACHE.stats(),
+        "image_cache": IMAGE_CACHE.stats()
+    }
@@ -0,0 +1,162 @@
+import numpy as np
+
+from art.frame import ArtFrame
+
+KEYFRAME_INTERVAL = 60  # broadcasts between keyframes (~2s at 30 Hz)
+
+
+def _new_points(prev_trail, trail):
+    """
+    Points appended to a trail since prev_trail, or None if the two
+    no longer overlap (trail was cleared or moved on too far).
+    """
+    if not prev_trail:
+        return trail
+    last = prev_trail[-1]
+    for i in range(len(trail) - 1, -1, -1):
+        if trail[i] == last:
+            added = trail[i + 1:]
+            # a shorter-than-expected ring means we matched a stale point
+            if len(prev_trail) + len(added) < len(trail):
+                return None
+            return added
+    return None
+
+
+def _array_delta(prev, frame):
+    """_delta's agent entries for two ArtFrames, computed on the arrays."""
+    old, new = prev.trails, frame.trails
+    n, length = new.shape[0], new.shape[1]
+    xs = frame.pos[:, 0].tolist()
+    ys = frame.pos[:, 1].tolist()
+    changed = np.nonzero((prev.color != frame.color).any(axis=1))[0]
+    colors = {i: tuple(frame.color[i].tolist()) for i in changed.tolist()}
+
+    # same rule as _new_points: the newest occurrence of the old last point
+    if old.shape[1] == 0:
+        added = np.full(n, length)
+        ok = np.ones(n, dtype=bool)
+    elif length == 0:
+        added = np.zeros(n, dtype=int)
+        ok = np.zeros(n, dtype=bool)
+    else:
+        match = (new == old[:, -1:, :]).all(axis=2)
+        last = length - 1 - np.argmax(match[:, ::-1], axis=1)
+        added = length - 1 - last
+        ok = match.any(axis=1) & (old.shape[1] + added >= length)
+
+    if n and ok.all() and (added == added[0]).all():
+        # trails advance in lockstep, so this is the usual case
+        adds = new[:, length - int(added[0]):].tolist()
+    else:
+        adds = [new[i, length - int(added[i]):].tolist() if ok[i] else None for i in range(n)]
+
+    agents = []
+    for i in range(n):
+        entry = {"x": xs[i], "y": ys[i]}
+        if i in colors:
+            entry["color"] = colors[i]
+        if adds[i] is None:
+            entry["trail"] = new[i].tolist()
+        else:
+            entry["add"] = adds[i]
+            entry["len"] = length
+        agents.append(entry)
+    return agents
+
+
+class ArtDeltaEncoder:
+    """
+    Turns full art frames into a keyframe/delta stream.
+
+    Keyframes carry the complete frame. Deltas carry each agent's position,
+    its colour when it changed, and only the trail points added since the
+    previous frame plus the trail length to trim to. Every message has a
+    sequence number and each delta names the seq it applies to in "base"
+    (seq - 1, or older for a client whose frame rate is capped, see
+    delta_from); a client whose last seq isn't the base asks for a resync
+    and gets keyframe() for the latest encoded frame.
+    """
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self._prev = None
+        self._last_message = None
+        self._since_key = 0
+
+    def encode(self, frame):
+        # re-broadcasts of the same frame (e.g. from /chat) keep their seq
+        if frame is self._prev and self._last_message is not None:
+            return self._last_message
+
+        self.seq += 1
+        prev = self._prev
+        if (
+            prev is None
+            or self._since_key >= self.keyframe_interval
+            or len(prev.get("agents", [])) != len(frame.get("agents", []))
+        ):
+            message = self._keyframe(frame)
+            self._since_key = 0
+        else:
+            message = self._delta(prev, frame, self.seq - 1)
+            self._since_key += 1
+
+        self._prev = frame
+        self._last_message = message
+        return message
+
+    def delta_from(self, base_seq, base_frame):
+        """Delta from an older frame a client still has to the latest one."""
+        if self._prev is None:
+            return None
+        if len(base_frame.get("agents", [])) != len(self._prev.get("agents", [])):
+            return self._keyframe(self._prev)
+        return self._delta(base_frame, self._prev, base_seq)
+
+    @property
+    def frame(self):
+        """The latest encoded frame."""
+        return self._prev
+
+    def keyframe(self):
+        if self._prev is None:
+            return None
+        return self._keyframe(self._prev)
+
+    def _keyframe(self, frame):
+        return {
+            "kind": "key",
+            "seq": self.seq,
+            "agents": frame.get("agents", []),
+            "meta": frame.get("meta", {})
+        }
+
+    def _delta(self, prev, frame, base):
+        if isinstance(prev, ArtFrame) and isinstance(frame, ArtFrame):
+            return self._delta_message(_array_delta(prev, frame), frame, base)
+
+        agents = []
+        for old, new in zip(prev["agents"], frame["agents"]):
+            entry = {"x": new["x"], "y": new["y"]}
+            if new.get("color") != old.get("color"):
+                entry["color"] = new.get("color")
+
+            trail = new.get("trail", [])
+            added = _new_points(old.get("trail", []), trail)
+            if added is None:
+                entry["trail"] = trail
+            else:
+                entry["add"] = added
+                entry["len"] = len(trail)
+            agents.append(entry)
+        return self._delta_message(agents, frame, base)
+
+    def _delta_message(self, agents, frame, base):
+        return {
+            "kind": "delta",
+            "seq": self.seq,
+            "base": base,
+            "agents": agents,
+            "meta": frame.get("meta", {})
+        }
@@ -1,21 +1,10 @@
-from backend.orchestrator.state import GLOBAL_STATE, HISTORY
+from backend.orchestrator.state import HISTORY, touch
 from backend.utils.safety import apply_delta
-from backend.orchestrator.ws_manager import manager
 from art.engine import ART_STATE
 from music.engine import MUSIC_STATE
 from architecture.engine import ARCH_STATE
 from story.engine import STORY_STATE
-from anyio import from_thread
-import art.engine as engine
-from art.runtime import ART_RUNTIME
-import random
-import math
-import pygame
-from music.runtime import MusicRuntime
-from architecture.engine import ARCH_STATE
-from backend.orchestrator.state import GLOBAL_STATE
-from backend.orchestrator.frame_loop import STORY_RUNTIME
-MUSIC_RUNTIME = MusicRuntime()
+from backend.orchestrator.runtimes import ART_RUNTIME
 
 def apply_parameters(params):
     HISTORY.append(params)
@@ -32,15 +21,10 @@ def apply_parameters(params):
     if "story" in params:
         _apply_story(params["story"])
 
-    frame = ART_RUNTIME.get_frame()
-    if frame:
-        GLOBAL_STATE["art_frame"] = frame
-
-        music_frame = MUSIC_RUNTIME.step(frame)
-        if music_frame:
-            GLOBAL_STATE["music_frame"] = music_frame
+    # ART_STATE goes out as meta.art_state
+    touch("meta")
 
-    # Story frame is now updated in frame_loop.py
+    # Frames pick up the new parameters on the next frame_loop tick
 
 def _apply_art(p):
     if "emotion" in p:
@@ -66,11 +50,8 @@ def _apply_art(p):
     if "shape" in p:
         ART_STATE["shape"] = p["shape"]["value"]
 
-        for agent in ART_RUNTIME.agents:
-            agent.history.clear()
-            if hasattr(agent, "_shape_mem"):
-                agent._shape_mem["star_target"] = None
-                agent._shape_mem["star_timer"] = 0
+        ART_RUNTIME.clear_trails()
+        ART_RUNTIME.reset_shape_memory()
 
     if "paused" in p:
         ART_STATE["paused"] = p["paused"]["value"]
@@ -84,17 +65,9 @@ def _apply_art(p):
         }
         ART_STATE["art_mode"] = MODE_MAP.get(ui_mode, "chaos")
         ART_STATE["paused"] = False
-        for agent in ART_RUNTIME.agents:
-            angle = random.uniform(0, 2 * math.pi)
-            agent.vel = pygame.Vector2(
-                math.cos(angle),
-                math.sin(angle)
-            ) * random.uniform(0.6, 1.2)
-
-            agent.history.clear()
-            if hasattr(agent, "_shape_mem"):
-                agent._shape_mem["star_target"] = None
-                agent._shape_mem["star_timer"] = 0
+        ART_RUNTIME.scatter_velocities()
+        ART_RUNTIME.clear_trails()
+        ART_RUNTIME.reset_shape_memory()
 
 def _apply_music(p):
     if "tempo_shift" in p and p["tempo_shift"]["confidence"] > 0.4:
@@ -1,64 +1,157 @@
+import asyncio
+import os
 import time
-from backend.orchestrator.state import GLOBAL_STATE
+import threading
+import numpy as np
+from backend.orchestrator.state import publish, publish_many, snapshot
 from backend.orchestrator.ws_manager import manager
-from art.runtime import ART_RUNTIME
-from architecture import ARCHITECTURE_RUNTIME
-from story.runtime import StoryRuntime
-from music.runtime import MusicRuntime
-from anyio import from_thread
+from backend.utils.scheduler import FixedRateLoop
+from backend.orchestrator.runtimes import ART_RUNTIME, ARCHITECTURE_RUNTIME, MUSIC_RUNTIME, STORY_RUNTIME
+
+COLLISION_THRESHOLD = 10  # pixels
+NUMPY_COLLISION_MIN_AGENTS = 400  # swarm size where the vectorized grid wins
+# publish + broadcast rate; each client is further capped by its own fps
+FRAME_LOOP_HZ = float(os.getenv("BROADCAST_HZ", "30"))
+
+# broadcasts that fell behind are dropped, not sent in a burst
+FRAME_SCHEDULER = FixedRateLoop("frame_loop", FRAME_LOOP_HZ, max_catch_up=1)
+
+
+def _positions(agents_data):
+    """x and y arrays; an ArtFrame's agents hand over their array without building dicts."""
+    pos = getattr(agents_data, "pos", None)
+    if pos is not None:
+        return pos[:, 0], pos[:, 1]
+    xs = np.fromiter((a["x"] for a in agents_data), dtype=float, count=len(agents_data))
+    ys = np.fromiter((a["y"] for a in agents_data), dtype=float, count=len(agents_data))
+    return xs, ys
+
+
+def _collision_pairs_grid(agents_data, threshold):
+    """Bucket agents into threshold-sized cells and only compare neighboring cells."""
+    threshold_sq = threshold * threshold
+    xs, ys = (coords.tolist() for coords in _positions(agents_data))
+    cells = {}
+    for i in range(len(xs)):
+        cells.setdefault((int(xs[i] // threshold), int(ys[i] // threshold)), []).append(i)
+
+    pairs = []
+    for (cx, cy), members in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                others = cells.get((cx + dx, cy + dy))
+                if not others:
+                    continue
+                for i in members:
+                    for j in others:
+                        if j <= i:
+                            continue
+                        ddx = xs[i] - xs[j]
+                        ddy = ys[i] - ys[j]
+                        if ddx * ddx + ddy * ddy < threshold_sq:
+                            pairs.append((i, j))
+    pairs.sort()
+    return pairs
+
+
+def _collision_pairs_numpy(agents_data, threshold):
+    """
+    The same uniform grid as _collision_pairs_grid, vectorized: agents are
+    sorted by cell, then every agent is paired in bulk with the later agents
+    of its own cell and all agents of four neighboring cells (the other four
+    neighbors see it from their side). The work follows the number of nearby
+    pairs, however the swarm is spread along either axis.
+    """
+    xs, ys = _positions(agents_data)
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    cx = np.floor(xs / threshold).astype(np.int64)
+    cy = np.floor(ys / threshold).astype(np.int64)
+    # one int key per cell; a spare row above and below keeps y +-1 from wrapping
+    cy = cy - cy.min() + 1
+    stride = int(cy.max()) + 2
+    keys = (cx - cx.min()) * stride + cy
+
+    order = np.argsort(keys, kind="stable")
+    sx, sy, skeys = xs[order], ys[order], keys[order]
+    cells, starts, counts = np.unique(skeys, return_index=True, return_counts=True)
+    n = len(skeys)
+    index = np.arange(n)
+    threshold_sq = threshold * threshold
+
+    found = []
+    for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        target = skeys + dx * stride + dy
+        slot = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        hit = cells[slot] == target
+        first = np.where(hit, starts[slot], 0)
+        count = np.where(hit, counts[slot], 0)
+        if dx == 0 and dy == 0:
+            # own cell: only the agents sorted after this one
+            end = first + count
+            first = index + 1
+            count = end - first
+        total = int(count.sum())
+        if not total:
+            continue
+        i = np.repeat(index, count)
+        j = np.repeat(first - (np.cumsum(count) - count), count) + np.arange(total)
+        ddx = sx[i] - sx[j]
+        ddy = sy[i] - sy[j]
+        close = ddx * ddx + ddy * ddy < threshold_sq
+        a, b = order[i[close]], order[j[close]]
+        # (low, high) as one sortable int, so ordering the pairs is a plain sort
+        found.append(np.minimum(a, b) * n + np.maximum(a, b))
+
+    if not found:
+        return []
+    pairs = np.sort(np.concatenate(found))
+    return list(zip((pairs // n).tolist(), (pairs % n).tolist()))
 
-STORY_RUNTIME = StoryRuntime()
-MUSIC_RUNTIME = MusicRuntime()
 
 def detect_collisions(agents_data):
     """Detect collisions between agents for story events"""
     events = []
     if not agents_data:
         return events
-    
-    COLLISION_THRESHOLD = 10  # pixels
-    
-    for i, a1 in enumerate(agents_data):
-        for j, a2 in enumerate(agents_data[i+1:], start=i+1):
-            dx = a1["x"] - a2["x"]
-            dy = a1["y"] - a2["y"]
-            dist = (dx*dx + dy*dy) ** 0.5
-            
-            if dist < COLLISION_THRESHOLD:
-                events.append({
-                    "frame": STORY_RUNTIME.current_frame,
-                    "type": "collision",
-                    "info": {"agents": [i, j]}
-                })
+
+    if len(agents_data) >= NUMPY_COLLISION_MIN_AGENTS:
+        pairs = _collision_pairs_numpy(agents_data, COLLISION_THRESHOLD)
+    else:
+        pairs = _collision_pairs_grid(agents_data, COLLISION_THRESHOLD)
+
+    for i, j in pairs:
+        events.append({
+            "frame": STORY_RUNTIME.current_frame,
+            "type": "collision",
+            "info": {"agents": [i, j]}
+        })
     
     return events
 
-def frame_loop():
-    # Initialize story on startup - always provide SOMETHING
-    print("🚀 Initializing story on startup...")
-    
-    # Start with a guaranteed fallback
-    GLOBAL_STATE["story_frame"] = {
-        "paragraphs": [
-            {"type": "header", "content": "🌱 THE AWAKENING"},
-            {"type": "paragraph", "content": "In the depths of digital space, a swarm begins to stir. Autonomous agents, each with their own simple rules, start to move and interact. What emerges from their collective behavior is far greater than the sum of their parts."},
-            {"type": "paragraph", "content": "Watch as they create art through motion, compose music through harmony, design architecture through spatial relationships, and weave stories through their encounters. This is emergence in action."},
-            {"type": "paragraph", "content": "The journey begins now. Each agent follows its path, unaware of the greater patterns forming. Yet together, they paint, they sing, they build, they tell tales of digital life."}
-        ],
-        "meta": {
-            "tone": "neutral",
-            "mood": "hopeful",
-            "pace": "moderate",
-            "total_events": 0,
-            "current_frame": 0
-        },
-        "phase": "introduction",
-        "story_events": [],
-        "enhanced": False
-    }
-    print("✅ Fallback story initialized")
-    
-    # Try to enhance with LLM in background (non-blocking)
+# startup timings, served at GET /metrics
+LOOP_METRICS = {
+    "time_to_first_frame_s": None,
+    "story_enhancement_s": None,
+    "story_enhanced": None,
+}
+
+# shown until Groq's intro arrives (or for good when it doesn't)
+STARTUP_INTRO = [
+    {"type": "header", "content": "🌱 THE AWAKENING"},
+    {"type": "paragraph", "content": "In the depths of digital space, a swarm begins to stir. Autonomous agents, each with their own simple rules, start to move and interact. What emerges from their collective behavior is far greater than the sum of their parts."},
+    {"type": "paragraph", "content": "Watch as they create art through motion, compose music through harmony, design architecture through spatial relationships, and weave stories through their encounters. This is emergence in action."},
+    {"type": "paragraph", "content": "The journey begins now. Each agent follows its path, unaware of the greater patterns forming. Yet together, they paint, they sing, they build, they tell tales of digital life."}
+]
+
+
+def enhance_startup_story():
+    """
+    Hand the story runtime an LLM intro once Groq answers (runs off the
+    frame loop); story_enhanced turns True when a frame carrying it is
+    actually published.
+    """
+    started = time.monotonic()
     try:
         from backend.api.story import enhance_story_with_llm
         print("🤖 Attempting LLM enhancement...")
@@ -74,44 +167,102 @@ def frame_loop():
             base_story=None
         )
         
-        if enhanced and enhanced.get("paragraphs") and len(enhanced["paragraphs"]) > 2:
-            GLOBAL_STATE["story_frame"]["paragraphs"] = enhanced["paragraphs"]
-            GLOBAL_STATE["story_frame"]["enhanced"] = True
-            print(f"✅ LLM enhancement successful: {len(enhanced['paragraphs'])} paragraphs")
+        if not enhanced.get("llm"):
+            LOOP_METRICS["story_enhanced"] = False
+            print("⚠️ Groq did not answer, keeping fallback")
+        elif len(enhanced.get("paragraphs") or []) > 2:
+            LOOP_METRICS["story_enhanced"] = False
+            STORY_RUNTIME.set_intro(enhanced["paragraphs"], enhanced=True)
+            print(f"🤖 LLM intro ready: {len(enhanced['paragraphs'])} paragraphs")
         else:
+            LOOP_METRICS["story_enhanced"] = False
             print("⚠️ LLM returned insufficient content, keeping fallback")
     except Exception as e:
+        LOOP_METRICS["story_enhanced"] = False
         print(f"⚠️ LLM enhancement failed: {e}")
         print("✅ Using fallback story (this is fine!)")
+    LOOP_METRICS["story_enhancement_s"] = round(time.monotonic() - started, 3)
+
+
+def frame_loop(loop=None):
+    """
+    Publish and broadcast at FRAME_LOOP_HZ. loop is the server's event loop;
+    broadcasts are handed to it from this thread.
+    """
+    started = time.monotonic()
+
+    # Initialize story on startup - always provide SOMETHING
+    print("🚀 Initializing story on startup...")
     
-    while True:
+    # Start with a guaranteed fallback; the story runtime keeps showing it
+    # (then the LLM intro) until the swarm's own story gets going
+    STORY_RUNTIME.set_intro(STARTUP_INTRO)
+    publish("story_frame", {
+        "paragraphs": list(STARTUP_INTRO),
+        "meta": {
+            "tone": "neutral",
+            "mood": "hopeful",
+            "pace": "moderate",
+            "total_events": 0,
+            "current_frame": 0
+        },
+        "phase": "introduction",
+        "story_events": [],
+        "enhanced": False
+    })
+    print("✅ Fallback story initialized")
+    
+    # Enhance with LLM in the background so frames start streaming right away
+    threading.Thread(target=enhance_startup_story, daemon=True).start()
+
+    last = {"story_frame": None}
+
+    def tick():
+        current = snapshot()
         art_frame = ART_RUNTIME.get_frame()
         arch_frame = ARCHITECTURE_RUNTIME.step()
+        # everything this tick produced goes out as one snapshot
+        updates = {}
 
         if art_frame:
-            GLOBAL_STATE["art_frame"] = art_frame
+            if art_frame is not current.get("art_frame"):
+                updates["art_frame"] = art_frame
             
             # Update music frame based on art frame
             music_frame = MUSIC_RUNTIME.step(art_frame)
             if music_frame:
-                GLOBAL_STATE["music_frame"] = music_frame
+                updates["music_frame"] = music_frame
             
             # Extract events from art frame for story generation
             agents = art_frame.get("agents", [])
             events = detect_collisions(agents)
             
-            # Update story frame
+            # Update story frame (same object back when nothing changed).
+            # Compare with the runtime's last frame, not GLOBAL_STATE, so an
+            # LLM-enhanced story isn't overwritten by an unchanged runtime frame.
             story_frame = STORY_RUNTIME.step(events)
-            GLOBAL_STATE["story_frame"] = story_frame
+            if story_frame is not last["story_frame"]:
+                last["story_frame"] = story_frame
+                updates["story_frame"] = story_frame
 
-        if arch_frame:
+        if arch_frame and arch_frame is not current.get("architecture"):
             # Keep the key name aligned with what the frontend expects
-            GLOBAL_STATE["architecture"] = arch_frame
+            updates["architecture"] = arch_frame
+
+        if updates:
+            publish_many(updates)
+            if updates.get("story_frame", {}).get("enhanced") and not LOOP_METRICS["story_enhanced"]:
+                LOOP_METRICS["story_enhanced"] = True
+                print("✅ LLM enhancement successful: intro published")
 
-        try:
-            from_thread.run(manager.broadcast, GLOBAL_STATE)
-        except RuntimeError:
-            pass
+        if loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(manager.broadcast(snapshot()), loop).result(timeout=1.0)
+            except Exception as e:
+                print("WS broadcast failed:", e)
 
-        time.sleep(1 / 30)
+        if art_frame and LOOP_METRICS["time_to_first_frame_s"] is None:
+            LOOP_METRICS["time_to_first_frame_s"] = round(time.monotonic() - started, 3)
+            print(f"🎬 First frame after {LOOP_METRICS['time_to_first_frame_s']}s")
 
+    FRAME_SCHEDULER.run(tick)
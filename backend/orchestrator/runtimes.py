@@ -0,0 +1,36 @@
+# The one instance of every engine runtime. frame_loop is the only caller
+# that steps them; API handlers import from here and only read frames.
+import os
+
+from music.runtime import MusicRuntime
+from story.runtime import StoryRuntime
+
+# "thread" runs art and architecture inside the API process; "process" moves
+# them to worker processes so heavy swarms don't hold the API's GIL
+SIM_WORKERS = os.getenv("SIM_WORKERS", "thread")
+
+if SIM_WORKERS == "process":
+    from backend.orchestrator.workers import ProcessArtRuntime, ProcessArchitectureRuntime
+    ART_RUNTIME = ProcessArtRuntime()
+    ARCHITECTURE_RUNTIME = ProcessArchitectureRuntime()
+else:
+    from art.runtime import ART_RUNTIME
+    from architecture import ARCHITECTURE_RUNTIME
+
+MUSIC_RUNTIME = MusicRuntime()
+STORY_RUNTIME = StoryRuntime()
+
+RUNTIMES = {
+    "art": ART_RUNTIME,
+    "architecture": ARCHITECTURE_RUNTIME,
+    "music": MUSIC_RUNTIME,
+    "story": STORY_RUNTIME,
+}
+
+
+def start_runtimes():
+    """Start whatever runs on its own (the art thread, or the worker processes)."""
+    for runtime in RUNTIMES.values():
+        start = getattr(runtime, "start", None)
+        if start is not None:
+            start()
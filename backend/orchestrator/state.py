@@ -1,3 +1,5 @@
+import threading
+
 GLOBAL_STATE = {
     "art": {},
     "music": {},
@@ -10,4 +12,51 @@ GLOBAL_STATE = {
     }
 }
 
-HISTORY = []
\ No newline at end of file
+HISTORY = []
+
+# per-section change counters; broadcast reuses encoded sections whose
+# version hasn't moved and subscribed clients only get sections that did
+VERSIONS = {}
+GLOBAL_STATE["versions"] = VERSIONS
+
+# GLOBAL_STATE is the writers' working copy. Readers (broadcast, /state,
+# handlers) use snapshot(): a new dict built under _WRITE_LOCK on every
+# publish and swapped in by reference, so they always see one consistent
+# state without locking. Published values are never mutated afterwards;
+# copy a section before changing it and publish the copy.
+_WRITE_LOCK = threading.Lock()
+_SNAPSHOT = {"current": {**GLOBAL_STATE, "versions": {}}}
+
+
+def _swap_snapshot():
+    # caller holds _WRITE_LOCK
+    _SNAPSHOT["current"] = {**GLOBAL_STATE, "versions": dict(VERSIONS)}
+
+
+def snapshot():
+    """Latest published state. Treat as read-only."""
+    return _SNAPSHOT["current"]
+
+
+def publish(section, value):
+    """
+    Set a GLOBAL_STATE section and bump its version. Call this for every
+    write; value must be a fresh object, not one already published.
+    """
+    publish_many({section: value})
+
+
+def publish_many(sections):
+    """Publish several sections as one snapshot, so readers never see half a tick."""
+    with _WRITE_LOCK:
+        for section, value in sections.items():
+            GLOBAL_STATE[section] = value
+            VERSIONS[section] = VERSIONS.get(section, 0) + 1
+        _swap_snapshot()
+
+
+def touch(section):
+    """Bump a version for state mutated outside GLOBAL_STATE (e.g. ART_STATE in meta)."""
+    with _WRITE_LOCK:
+        VERSIONS[section] = VERSIONS.get(section, 0) + 1
+        _swap_snapshot()
@@ -0,0 +1,122 @@
+import json
+
+import numpy as np
+
+from art.frame import AgentList, ArtFrame
+
+try:
+    import msgpack
+except ImportError:  # optional, clients fall back to JSON
+    msgpack = None
+
+WIRE_FORMATS = {"json", "msgpack"} if msgpack is not None else {"json"}
+
+# (section, fmt) -> (version, value, encoded); see encode_payload
+_SECTION_CACHE = {}
+
+
+def _plain(value):
+    # ArtFrame / AgentList for encoders without an array path
+    if isinstance(value, ArtFrame):
+        return value.to_dict()
+    if isinstance(value, AgentList):
+        return value.to_list()
+    raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def _array_header(n):
+    return bytes([0x90 | n]) if n < 16 else (b"\xdc" + n.to_bytes(2, "big") if n < 65536 else b"\xdd" + n.to_bytes(4, "big"))
+
+
+def _pack_agents(frame):
+    """
+    msgpack for frame["agents"] straight from the ArtFrame arrays: every
+    agent has the same shape, so the whole list is one NumPy record array.
+    Decodes to the same value msgpack.packb(..., use_single_float=True)
+    gives for the dicts (colors as uint8 ints, floats as float32).
+    """
+    n, length = frame.trails.shape[0], frame.trails.shape[1]
+    point = np.dtype([("arr", "u1"), ("fx", "u1"), ("x", ">f4"), ("fy", "u1"), ("y", ">f4")])
+    record = np.dtype([
+        ("map", "u1"),
+        ("kx", "S2"), ("fx", "u1"), ("x", ">f4"),
+        ("ky", "S2"), ("fy", "u1"), ("y", ">f4"),
+        ("kc", "S7"), ("color", "u1", (3, 2)),
+        ("kt", "S6"), ("arr", "u1"), ("len", ">u2"),
+        ("trail", point, (length,))
+    ])
+    out = np.empty(n, dtype=record)
+    out["map"] = 0x84
+    out["kx"], out["fx"], out["x"] = b"\xa1x", 0xca, frame.pos[:, 0]
+    out["ky"], out["fy"], out["y"] = b"\xa1y", 0xca, frame.pos[:, 1]
+    out["kc"] = b"\xa5color\x93"
+    out["color"][:, :, 0] = 0xcc
+    out["color"][:, :, 1] = frame.color
+    out["kt"], out["arr"], out["len"] = b"\xa5trail", 0xdc, length
+    trail = out["trail"]
+    trail["arr"], trail["fx"], trail["fy"] = 0x92, 0xca, 0xca
+    trail["x"] = frame.trails[:, :, 0]
+    trail["y"] = frame.trails[:, :, 1]
+    return _array_header(n) + out.tobytes()
+
+
+def _packb(value):
+    if isinstance(value, ArtFrame):
+        value = {"agents": value["agents"], "meta": value.meta}
+    if isinstance(value, AgentList):
+        return _pack_agents(value.frame)
+    if isinstance(value, dict):
+        packer = msgpack.Packer(use_bin_type=True)
+        return packer.pack_map_header(len(value)) + b"".join(_packb(k) + _packb(v) for k, v in value.items())
+    return msgpack.packb(value, use_bin_type=True, use_single_float=True, default=_plain)
+
+
+def _encode_value(value, fmt):
+    if fmt == "msgpack" and msgpack is not None:
+        return _packb(value)
+    # same separators starlette's send_json uses
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_plain)
+
+
+def _encode_section(section, value, fmt, versions):
+    version = versions.get(section)
+    if version is None:
+        return _encode_value(value, fmt)
+    cached = _SECTION_CACHE.get((section, fmt))
+    # identity check too: a delta art_frame shares the version of the full one
+    if cached is not None and cached[0] == version and cached[1] is value:
+        return cached[2]
+    encoded = _encode_value(value, fmt)
+    _SECTION_CACHE[(section, fmt)] = (version, value, encoded)
+    return encoded
+
+
+def encode_payload(message: dict, fmt="json", versions=None):
+    """
+    Serialize a broadcast once so the same text/bytes can go to every
+    subscriber. msgpack packs floats as float32, which is plenty for
+    canvas coordinates and roughly halves trail payloads.
+
+    With versions (see state.publish), each top-level section is encoded
+    separately and reused until its version moves, so an unchanged story
+    or architecture section costs a string join instead of a re-encode.
+    """
+    if not versions:
+        return _encode_value(message, fmt)
+
+    parts = [(key, _encode_section(key, value, fmt, versions)) for key, value in message.items()]
+    if fmt == "msgpack" and msgpack is not None:
+        packer = msgpack.Packer(use_bin_type=True)
+        out = [packer.pack_map_header(len(parts))]
+        for key, encoded in parts:
+            out.append(packer.pack(key))
+            out.append(encoded)
+        return b"".join(out)
+    return "{" + ",".join(json.dumps(key, ensure_ascii=False) + ":" + encoded for key, encoded in parts) + "}"
+
+
+async def send_encoded(websocket, data):
+    if isinstance(data, bytes):
+        await websocket.send_bytes(data)
+    else:
+        await websocket.send_text(data)
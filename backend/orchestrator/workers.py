@@ -0,0 +1,327 @@
+import atexit
+import json
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from art.engine import ART_STATE, MAX_TRAIL_LENGTH, get_frame_meta
+from art.frame import ArtFrame
+from architecture.engine import ARCH_STATE
+from backend.utils.scheduler import LOOPS
+
+RING_SLOTS = 4      # frames kept in shared memory; the reader only wants the newest
+META_BYTES = 1024   # room for the JSON-encoded frame meta
+ARCH_WORKER_HZ = 10
+
+_HEADER = 5         # int64: seq, agent count, meta length, commit seq, trail length (-1 = per agent)
+_STATS = 4          # float64: target hz, actual hz, overruns, dropped ticks
+
+
+class FrameRing:
+    """
+    Single-writer ring of art frames in shared memory.
+
+    Each slot holds the frame as arrays: pos (n, 2) and trails (n, len, 2)
+    as float32, color (n, 3) as uint8, plus per-agent trail lengths for
+    frames whose trails aren't in lockstep (the objects backend). The
+    worker writes each frame into the next slot and bumps a shared
+    counter; the API process copies the newest slot out with a few
+    memcpys. A slot is committed by writing its seq a second time after
+    the data, so a reader that raced the writer sees the mismatch and
+    retries instead of returning a torn frame.
+    """
+    def __init__(self, agent_count, slots=RING_SLOTS, name=None):
+        self.agent_count = agent_count
+        self.slots = slots
+        n = agent_count
+        layout = (
+            ("pos", (n, 2), np.float32),
+            ("color", (n, 3), np.uint8),
+            ("lengths", (n,), np.int32),
+            ("trails", (n, MAX_TRAIL_LENGTH, 2), np.float32),
+            ("meta", (META_BYTES,), np.uint8),
+        )
+        # 8-byte aligned slot sections
+        sizes = [-(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8 for _, shape, dtype in layout]
+        slot_bytes = _HEADER * 8 + sum(sizes)
+        prefix = 8 + _STATS * 8
+        size = prefix + slots * slot_bytes
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+
+        buf = self.shm.buf
+        self.counter = np.ndarray((1,), dtype=np.int64, buffer=buf)
+        self.loop_stats = np.ndarray((_STATS,), dtype=np.float64, buffer=buf, offset=8)
+        self.headers = []
+        self.arrays = {field: [] for field, _, _ in layout}
+        for i in range(slots):
+            offset = prefix + i * slot_bytes
+            self.headers.append(np.ndarray((_HEADER,), dtype=np.int64, buffer=buf, offset=offset))
+            offset += _HEADER * 8
+            for (field, shape, dtype), nbytes in zip(layout, sizes):
+                self.arrays[field].append(np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset))
+                offset += nbytes
+
+    def _begin(self):
+        seq = int(self.counter[0]) + 1
+        header = self.headers[seq % self.slots]
+        header[3] = -1
+        header[0] = seq
+        return seq, seq % self.slots
+
+    def _commit(self, seq, i, count, meta, trail_length):
+        meta = json.dumps(meta).encode("utf-8")[:META_BYTES]
+        self.arrays["meta"][i][:len(meta)] = np.frombuffer(meta, dtype=np.uint8)
+        header = self.headers[i]
+        header[1] = count
+        header[2] = len(meta)
+        header[4] = trail_length
+        header[3] = seq
+        self.counter[0] = seq
+
+    def write_arrays(self, pos, color, trails, meta):
+        """Write a frame straight from swarm arrays; trails is (n, len, 2), oldest point first."""
+        seq, i = self._begin()
+        count = min(len(pos), self.agent_count)
+        length = min(trails.shape[1], MAX_TRAIL_LENGTH)
+        self.arrays["pos"][i][:count] = pos[:count]
+        self.arrays["color"][i][:count] = color[:count]
+        self.arrays["trails"][i][:count, :length] = trails[:count, trails.shape[1] - length:]
+        self._commit(seq, i, count, meta, length)
+
+    def write(self, frame):
+        """Write an art frame: an ArtFrame by its arrays, a dict frame agent by agent."""
+        if isinstance(frame, ArtFrame):
+            self.write_arrays(frame.pos, frame.color, frame.trails, frame.meta)
+            return
+        seq, i = self._begin()
+        pos, color = self.arrays["pos"][i], self.arrays["color"][i]
+        lengths, trails = self.arrays["lengths"][i], self.arrays["trails"][i]
+        agents = frame.get("agents", [])[:self.agent_count]
+        for j, agent in enumerate(agents):
+            trail = agent.get("trail", [])[-MAX_TRAIL_LENGTH:]
+            pos[j] = (agent["x"], agent["y"])
+            color[j] = agent["color"][:3]
+            lengths[j] = len(trail)
+            if trail:
+                trails[j, :len(trail)] = trail
+        self._commit(seq, i, len(agents), frame.get("meta", {}), -1)
+
+    def read(self, last_seq=0):
+        """
+        (seq, frame) for the newest committed slot; frame is None if nothing
+        new. Array-written frames come back as an ArtFrame over copies of
+        the slot, dict-written ones as dicts.
+        """
+        for _ in range(3):
+            seq = int(self.counter[0])
+            if seq == 0 or seq == last_seq:
+                return last_seq, None
+            i = seq % self.slots
+            header = self.headers[i]
+            if header[0] != seq or header[3] != seq:
+                continue
+
+            count, meta_len, length = int(header[1]), int(header[2]), int(header[4])
+            pos = self.arrays["pos"][i][:count].copy()
+            color = self.arrays["color"][i][:count].copy()
+            if length >= 0:
+                trails = self.arrays["trails"][i][:count, :length].copy()
+            else:
+                lengths = self.arrays["lengths"][i][:count].tolist()
+                trails = [self.arrays["trails"][i][j, :lengths[j]].tolist() for j in range(count)]
+            meta = bytes(self.arrays["meta"][i][:meta_len])
+
+            # overwritten while we were copying it out
+            if header[0] != seq or header[3] != seq:
+                continue
+            meta = json.loads(meta or b"{}")
+            if length >= 0:
+                return seq, ArtFrame(pos, color, trails, meta)
+            xs, ys = pos[:, 0].tolist(), pos[:, 1].tolist()
+            colors = color.tolist()
+            frame = {
+                "agents": [
+                    {"x": xs[j], "y": ys[j], "color": tuple(colors[j]), "trail": trails[j]}
+                    for j in range(count)
+                ],
+                "meta": meta
+            }
+            return seq, frame
+        return last_seq, None
+
+    def close(self):
+        # only unlink: the NumPy views stay mapped until the process exits,
+        # and daemon threads may still be reading through them at shutdown
+        if self.owner:
+            self.shm.unlink()
+
+
+def _drain(commands):
+    while True:
+        try:
+            yield commands.get_nowait()
+        except queue.Empty:
+            return
+
+
+def _art_worker(ring_name, agent_count, backend, tick_hz, commands):
+    from art.runtime import ArtRuntime
+
+    ring = FrameRing(agent_count, name=ring_name)
+    runtime = ArtRuntime(agent_count, backend, tick_hz)
+
+    def step():
+        for command, arg in _drain(commands):
+            if command == "state":
+                ART_STATE.update(arg)
+            else:
+                getattr(runtime, command)()
+        runtime.tick()
+        swarm = runtime.swarm
+        if swarm is not None:
+            # straight from the swarm arrays into shared memory, no frame in between
+            ring.write_arrays(swarm.pos, swarm.color, swarm.trail_view(), get_frame_meta())
+        else:
+            ring.write(runtime.get_frame())
+        loop = runtime.scheduler
+        ring.loop_stats[:] = (loop.hz, loop.actual_hz, loop.overruns, loop.dropped_ticks)
+
+    runtime.scheduler.run(step)
+
+
+def _architecture_worker(commands, frames, hz):
+    from architecture.runtime import ArchitectureRuntime
+    from backend.utils.scheduler import FixedRateLoop
+
+    runtime = ArchitectureRuntime()
+    last = {"frame": None}
+
+    def step():
+        for command, arg in _drain(commands):
+            if command == "state":
+                ARCH_STATE.update(arg)
+        frame = runtime.step()
+        if frame is not None and frame is not last["frame"]:
+            last["frame"] = frame
+            frames.put(frame)
+
+    FixedRateLoop("architecture", hz).run(step)
+
+
+class ProcessArtRuntime:
+    """
+    ArtRuntime in a worker process (SIM_WORKERS=process).
+
+    Same interface as art.runtime.ArtRuntime for the frame loop and the
+    controller: frames come back through a FrameRing, ART_STATE changes
+    and the controller hooks go over a command queue.
+    """
+    def __init__(self, agent_count=50, backend=None, tick_hz=None):
+        from art.runtime import ART_BACKEND, ART_TICK_HZ
+
+        context = multiprocessing.get_context("spawn")
+        self.ring = FrameRing(agent_count)
+        self.commands = context.Queue()
+        self.process = context.Process(
+            target=_art_worker,
+            args=(self.ring.name, agent_count, backend or ART_BACKEND, tick_hz or ART_TICK_HZ, self.commands),
+            daemon=True
+        )
+        self.frame = None
+        self._seq = 0
+        self._state = None
+        LOOPS["art"] = self
+        atexit.register(self.close)
+
+    def start(self):
+        if not self.process.is_alive():
+            self.process.start()
+
+    def _sync_state(self):
+        state = dict(ART_STATE)
+        if state != self._state:
+            self._state = state
+            self.commands.put(("state", state))
+
+    def _command(self, name):
+        # state first, so the hook sees the same ART_STATE as in-process
+        self._sync_state()
+        self.commands.put((name, None))
+
+    def clear_trails(self):
+        self._command("clear_trails")
+
+    def reset_shape_memory(self):
+        self._command("reset_shape_memory")
+
+    def scatter_velocities(self):
+        self._command("scatter_velocities")
+
+    def get_frame(self):
+        self._sync_state()
+        seq, frame = self.ring.read(self._seq)
+        if frame is not None:
+            self._seq = seq
+            self.frame = frame
+        return self.frame
+
+    def stats(self):
+        hz, actual_hz, overruns, dropped = self.ring.loop_stats.tolist()
+        return {
+            "target_hz": hz,
+            "actual_hz": round(actual_hz, 2),
+            "ticks": int(self.ring.counter[0]),
+            "overruns": int(overruns),
+            "dropped_ticks": int(dropped),
+            "worker_pid": self.process.pid
+        }
+
+    def close(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+
+
+class ProcessArchitectureRuntime:
+    """ArchitectureRuntime in a worker process; frames arrive on a queue when they change."""
+    def __init__(self, hz=ARCH_WORKER_HZ):
+        context = multiprocessing.get_context("spawn")
+        self.enabled = True
+        self.version = 0
+        self.frame = None
+        self.commands = context.Queue()
+        self.frames = context.Queue()
+        self.process = context.Process(
+            target=_architecture_worker,
+            args=(self.commands, self.frames, hz),
+            daemon=True
+        )
+        self._state = None
+        atexit.register(self.close)
+
+    def start(self):
+        if not self.process.is_alive():
+            self.process.start()
+
+    def step(self):
+        state = dict(ARCH_STATE)
+        if state != self._state:
+            self._state = state
+            self.commands.put(("state", state))
+        for frame in _drain(self.frames):
+            self.frame = frame
+            self.version += 1
+        return self.frame
+
+    def close(self):
+        if self.process.is_alive():
+            self.process.terminate()
@@ -1,22 +1,290 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
 from fastapi import WebSocket
+from backend.orchestrator.art_delta import ArtDeltaEncoder
+from backend.orchestrator.state import VERSIONS
+from backend.orchestrator.wire import encode_payload, send_encoded
+
+SEND_QUEUE_SIZE = 4  # frames buffered per client before the oldest is dropped
+
+# per-client frame rate: starts at (and never exceeds) CLIENT_MAX_FPS, a client
+# may ask for less with {"max_fps": n}; backs off while its outbox is backing up
+CLIENT_MAX_FPS = float(os.getenv("CLIENT_MAX_FPS", "30"))
+CLIENT_MIN_FPS = float(os.getenv("CLIENT_MIN_FPS", "2"))
+BACKOFF_QUEUE_DEPTH = 2  # frames still queued at broadcast time that count as backing up
+BACKOFF_FACTOR = 0.5
+RECOVERY_FACTOR = 1.25   # applied after about a second of sends with an empty outbox
+
+# default max send rate (Hz) per GLOBAL_STATE section for subscribed clients;
+# story and architecture change far less often than the swarm
+TOPIC_RATES = {
+    "art_frame": 30,
+    "music_frame": 30,
+    "story_frame": 2,
+    "architecture": 2,
+    "meta": 2,
+    "image_progress": 10,
+}
+
+_client_ids = itertools.count(1)
+
+
+class ClientChannel:
+    """
+    One websocket plus its bounded outbox and writer task.
+
+    Broadcasts only enqueue already-encoded frames; the writer drains them
+    at whatever pace the client manages. When the outbox is full the oldest
+    frame is dropped, so a slow client sees fresh state instead of a growing
+    backlog (delta clients notice the seq gap and resync).
+    """
+    def __init__(self, websocket: WebSocket, maxsize=SEND_QUEUE_SIZE):
+        self.id = next(_client_ids)
+        self.websocket = websocket
+        self.maxsize = maxsize
+        # protocol choices, e.g. {"art_protocol": "delta", "format": "msgpack"}
+        self.options = {"art_protocol": "full", "format": "json"}
+        # None = legacy client, gets every section on every broadcast
+        self.topics = None
+        self.last_sent = {}
+        self.sent_versions = {}
+        self.queue = deque()
+        self.sent = 0
+        self.dropped = 0
+        self.lag = 0.0  # seconds the last sent frame spent queued
+        self.max_fps = CLIENT_MAX_FPS
+        self.fps = CLIENT_MAX_FPS
+        self.last_frame = 0.0
+        self._clean_sends = 0
+        # (seq, frame) of the last art frame this delta client received
+        self.art_base = None
+        self._ready = asyncio.Event()
+        self.task = None
+
+    def start(self, on_error):
+        self.task = asyncio.create_task(self._writer(on_error))
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def subscribe(self, topics):
+        """topics: list of section names (default rates) or {name: max_hz}."""
+        if not isinstance(topics, dict):
+            topics = {t: TOPIC_RATES.get(t) for t in topics if isinstance(t, str)}
+        self.topics = {
+            t: float(hz) for t, hz in topics.items()
+            if isinstance(t, str) and t in TOPIC_RATES
+            and isinstance(hz, (int, float)) and not isinstance(hz, bool) and hz > 0
+        }
+        self.last_sent = {}
+        self.sent_versions = {}
+        return self.topics
+
+    def set_max_fps(self, fps):
+        self.max_fps = min(max(float(fps), CLIENT_MIN_FPS), CLIENT_MAX_FPS)
+        self.fps = min(self.fps, self.max_fps)
+        return self.max_fps
+
+    def frame_due(self, now):
+        # small slack so a client at the broadcast rate isn't skipped by jitter
+        return now - self.last_frame >= 0.9 / self.fps
+
+    def adapt(self, backlog):
+        """
+        Halve the frame rate while frames are still queued from earlier
+        broadcasts, and step it back up once the client keeps up again.
+        """
+        if backlog >= BACKOFF_QUEUE_DEPTH:
+            self.fps = max(CLIENT_MIN_FPS, self.fps * BACKOFF_FACTOR)
+            self._clean_sends = 0
+        elif backlog == 0:
+            self._clean_sends += 1
+            if self._clean_sends >= self.fps and self.fps < self.max_fps:
+                self.fps = min(self.max_fps, self.fps * RECOVERY_FACTOR)
+                self._clean_sends = 0
+
+    def due_topics(self, message, now):
+        """
+        Subscribed sections present in message whose rate interval has
+        elapsed and whose version moved since we last sent them.
+        """
+        due = []
+        versions = message.get("versions") or VERSIONS
+        for topic, hz in self.topics.items():
+            if topic not in message:
+                continue
+            version = versions.get(topic)
+            if version is not None and self.sent_versions.get(topic) == version:
+                continue
+            # delta art streams must see every frame or they'd hit seq gaps
+            delta_art = topic == "art_frame" and self.options.get("art_protocol") == "delta"
+            if delta_art or now - self.last_sent.get(topic, 0.0) >= 1.0 / hz:
+                due.append(topic)
+        return due
+
+    def enqueue(self, data):
+        if len(self.queue) >= self.maxsize:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append((time.monotonic(), data))
+        self._ready.set()
+
+    async def _writer(self, on_error):
+        try:
+            while True:
+                await self._ready.wait()
+                while self.queue:
+                    queued_at, data = self.queue.popleft()
+                    await send_encoded(self.websocket, data)
+                    self.sent += 1
+                    self.lag = time.monotonic() - queued_at
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            on_error(self.websocket)
+
+    def stats(self):
+        return {
+            "client": self.id,
+            "options": dict(self.options),
+            "topics": self.topics,
+            "fps": round(self.fps, 2),
+            "max_fps": self.max_fps,
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "lag_ms": round(self.lag * 1000, 2)
+        }
+
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: list[WebSocket] = []
+        self.clients: dict[WebSocket, ClientChannel] = {}
+        self.art_encoder = ArtDeltaEncoder()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
+        channel = ClientChannel(websocket)
         self.active_connections.append(websocket)
+        self.clients[websocket] = channel
+        channel.start(self.disconnect)
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        channel = self.clients.pop(websocket, None)
+        if channel is not None:
+            channel.stop()
+
+    def set_option(self, websocket: WebSocket, key, value):
+        channel = self.clients.get(websocket)
+        if channel is not None:
+            channel.options[key] = value
+
+    async def send(self, websocket: WebSocket, message: dict):
+        """Queue one message for one client in the wire format it negotiated."""
+        channel = self.clients.get(websocket)
+        if channel is not None:
+            channel.enqueue(encode_payload(message, channel.options.get("format", "json")))
+
+    async def send_keyframe(self, websocket: WebSocket, message: dict):
+        """Send one client the latest art keyframe so it can (re)start a delta stream."""
+        channel = self.clients.get(websocket)
+        if channel is not None:
+            channel.art_base = None
+        keyframe = self.art_encoder.keyframe()
+        if keyframe is None:
+            # nothing encoded yet, the next broadcast will be a keyframe
+            return
+        await self.send(websocket, {**message, "art_frame": keyframe})
+        if channel is not None:
+            channel.art_base = (keyframe["seq"], self.art_encoder.frame)
+
+    def set_max_fps(self, websocket: WebSocket, fps):
+        channel = self.clients.get(websocket)
+        if channel is None:
+            return None
+        return channel.set_max_fps(fps)
+
+    def subscribe(self, websocket: WebSocket, topics):
+        channel = self.clients.get(websocket)
+        if channel is None:
+            return {}
+        return channel.subscribe(topics)
+
+    def _art_variant(self, channel, art):
+        """
+        Which art_frame a delta client gets this broadcast: the shared
+        message when it's a keyframe or the client has the previous seq,
+        a catch-up delta from the last frame it got when its frame rate is
+        capped, or a keyframe when it has nothing to build on.
+        """
+        if art["kind"] == "key":
+            return ("shared",)
+        if channel.art_base is None:
+            return ("key",)
+        base_seq = channel.art_base[0]
+        # base_seq == seq is a re-broadcast of a frame the client already has
+        if base_seq in (art["seq"], art["seq"] - 1):
+            return ("shared",)
+        return ("since", base_seq)
 
     async def broadcast(self, message: dict):
-        for connection in list(self.active_connections):
-            try:
-                await connection.send_json(message)
-            except:
-                self.disconnect(connection)
+        # encode once per (art variant, wire format, sections) group, not once per client
+        encoded = {}
+        art_messages = {}
+        now = time.monotonic()
+        # a state.snapshot() carries the versions its sections were published at
+        versions = message.get("versions") or VERSIONS
+        for channel in list(self.clients.values()):
+            if not channel.frame_due(now):
+                continue
+            opts = channel.options
+            sections = None
+            if channel.topics is not None:
+                sections = tuple(channel.due_topics(message, now))
+                if not sections:
+                    continue
+            variant = ("full",)
+            if (
+                message.get("art_frame")
+                and opts.get("art_protocol") == "delta"
+                and (sections is None or "art_frame" in sections)
+            ):
+                if ("shared",) not in art_messages:
+                    art_messages[("shared",)] = self.art_encoder.encode(message["art_frame"])
+                variant = self._art_variant(channel, art_messages[("shared",)])
+            key = (variant, opts.get("format", "json"), sections)
+            if key not in encoded:
+                payload = message
+                if variant != ("full",):
+                    if variant not in art_messages:
+                        if variant[0] == "key":
+                            art_messages[variant] = self.art_encoder.keyframe()
+                        else:
+                            base_seq = variant[1]
+                            art_messages[variant] = self.art_encoder.delta_from(base_seq, channel.art_base[1])
+                    payload = {**message, "art_frame": art_messages[variant]}
+                if sections is not None:
+                    payload = {topic: payload[topic] for topic in sections}
+                encoded[key] = encode_payload(payload, key[1], versions)
+            channel.adapt(len(channel.queue))
+            channel.enqueue(encoded[key])
+            channel.last_frame = now
+            if variant != ("full",):
+                channel.art_base = (self.art_encoder.seq, self.art_encoder.frame)
+            if sections is not None:
+                for topic in sections:
+                    channel.last_sent[topic] = now
+                    channel.sent_versions[topic] = versions.get(topic)
+
+    def stats(self):
+        return [channel.stats() for channel in self.clients.values()]
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
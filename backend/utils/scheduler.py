@@ -0,0 +1,81 @@
+import time
+
+MAX_CATCH_UP = 4  # ticks run back-to-back before the loop gives up on lost time
+STATS_WINDOW_S = 1.0
+
+# name -> FixedRateLoop, so GET /metrics can report every running loop
+LOOPS = {}
+
+
+class FixedRateLoop:
+    """
+    Runs step() at a fixed rate without drift.
+
+    Elapsed wall time goes into an accumulator and one step runs per
+    whole interval in it, so slow ticks are made up by running the next
+    ones back-to-back instead of stretching the period. At most
+    max_catch_up steps run per wake-up; time beyond that is dropped and
+    counted, so a stall doesn't turn into a long burst. The sleep targets
+    the next interval boundary rather than "now + interval".
+    """
+    def __init__(self, name, hz, max_catch_up=MAX_CATCH_UP):
+        self.name = name
+        self.hz = hz
+        self.interval = 1.0 / hz
+        self.max_catch_up = max_catch_up
+        self.ticks = 0
+        self.overruns = 0        # steps that took longer than one interval
+        self.dropped_ticks = 0   # intervals given up after hitting max_catch_up
+        self.actual_hz = 0.0
+        self.last_step_ms = 0.0
+        self._window_start = None
+        self._window_ticks = 0
+        LOOPS[name] = self
+
+    def run(self, step, keep_running=lambda: True):
+        accumulator = 0.0
+        last = time.monotonic()
+        self._window_start = last
+        while keep_running():
+            now = time.monotonic()
+            accumulator += now - last
+            last = now
+
+            steps = 0
+            while accumulator >= self.interval and steps < self.max_catch_up:
+                started = time.monotonic()
+                step()
+                elapsed = time.monotonic() - started
+                self.last_step_ms = elapsed * 1000
+                if elapsed > self.interval:
+                    self.overruns += 1
+                accumulator -= self.interval
+                steps += 1
+
+            if accumulator >= self.interval:
+                dropped = int(accumulator // self.interval)
+                self.dropped_ticks += dropped
+                accumulator -= dropped * self.interval
+
+            self._count(steps)
+            time.sleep(max(0.0, self.interval - accumulator - (time.monotonic() - last)))
+
+    def _count(self, steps):
+        self.ticks += steps
+        self._window_ticks += steps
+        now = time.monotonic()
+        window = now - self._window_start
+        if window >= STATS_WINDOW_S:
+            self.actual_hz = self._window_ticks / window
+            self._window_start = now
+            self._window_ticks = 0
+
+    def stats(self):
+        return {
+            "target_hz": self.hz,
+            "actual_hz": round(self.actual_hz, 2),
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "dropped_ticks": self.dropped_ticks,
+            "last_step_ms": round(self.last_step_ms, 3)
+        }
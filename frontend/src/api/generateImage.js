@@ -1,3 +1,5 @@
+import { API_BASE } from "../config/api";
+
 export async function generateFigurativeImage(optionalPrompt) {
   const res = await fetch(`${API_BASE}/generate-image`, {
     method: "POST",
@@ -16,4 +18,12 @@ export async function generateFigurativeImage(optionalPrompt) {
   return data;
 }
 
-
+// image_url is relative to the backend; fetch it so the download works cross-origin
+export async function fetchGeneratedImage(imageUrl) {
+  const res = await fetch(`${API_BASE}${imageUrl}`);
+  if (!res.ok) {
+    console.warn("Fetching generated image failed", res.status);
+    return null;
+  }
+  return res.blob();
+}
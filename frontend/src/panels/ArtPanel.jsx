@@ -2,7 +2,7 @@ import { useState } from "react";
 import { motion } from "framer-motion";
 import { Palette, Sparkles, Zap, Layout, Shapes, Smile, Sliders } from "lucide-react";
 import { sendIntent } from "../api/interpret.js";
-import { generateFigurativeImage } from "../api/generateImage.js";
+import { generateFigurativeImage, fetchGeneratedImage } from "../api/generateImage.js";
 
 // --- Styled Components ---
 
@@ -90,11 +90,19 @@ export default function ArtPanel() {
     setGenerating(true);
     try {
       const result = await generateFigurativeImage();
-      if (result && result.image_base64) {
+      const blob = result && result.image_url && (await fetchGeneratedImage(result.image_url));
+      if (blob) {
+        const url = URL.createObjectURL(blob);
         const a = document.createElement("a");
-        a.href = `data:image/png;base64,${result.image_base64}`;
+        a.href = url;
         a.download = "figurative_snapshot.png";
+        document.body.appendChild(a);
         a.click();
+        // revoking right after click() can cancel the download (Firefox)
+        setTimeout(() => {
+          a.remove();
+          URL.revokeObjectURL(url);
+        }, 1000);
       }
     } catch (e) {
       console.error(e);
@@ -184,6 +184,20 @@ class StoryRuntime:
         self.current_frame = 0
         self.story_text_cache = []
         self.last_text_update = 0
+        self.version = 0
+        self.frame = None
+        self._signature = None
+        # (paragraphs, enhanced) shown until the story has more to tell
+        self.intro = None
+
+    def set_intro(self, paragraphs, enhanced=False):
+        """
+        Opening paragraphs (the startup fallback, then the LLM version)
+        that frames carry instead of the generated text while the story is
+        still in its introduction phase or has no text yet. Safe to call
+        from another thread: step() reads the tuple once.
+        """
+        self.intro = (list(paragraphs), enhanced)
 
     def step(self, events):
         """
@@ -225,13 +239,33 @@ class StoryRuntime:
             paragraph_count = STORY_STATE.get("paragraph_count", 5)
             paragraphs = _enforce_constraints(paragraphs, word_limit, paragraph_count)
             
-            self.story_text_cache = paragraphs
+            if paragraphs != self.story_text_cache:
+                self.story_text_cache = paragraphs
             self.last_text_update = self.current_frame
 
-        return {
+        # Only rebuild the frame when something a reader can see changed;
+        # meta.current_frame is the frame of the last rebuild.
+        phase = self.mapper._get_phase(self.current_frame, self.total_frames)
+        intro = self.intro
+        if intro is not None and phase != "introduction" and self.story_text_cache:
+            intro = None
+        signature = (
+            len(self.mapper.story_events),
+            id(self.story_text_cache),
+            id(intro),
+            phase,
+            STORY_STATE.get("tone", "neutral"),
+            STORY_STATE.get("pace", "moderate"),
+            STORY_STATE.get("mood", "neutral"),
+        )
+        if self.frame is not None and signature == self._signature:
+            return self.frame
+
+        self.frame = {
             "story_events": self.mapper.story_events[-10:],  # Last 10 events
-            "phase": self.mapper._get_phase(self.current_frame, self.total_frames),
-            "paragraphs": self.story_text_cache,
+            "phase": phase,
+            "paragraphs": intro[0] if intro is not None else self.story_text_cache,
+            "enhanced": intro[1] if intro is not None else False,
             "meta": {
                 "tone": STORY_STATE.get("tone", "neutral"),
                 "pace": STORY_STATE.get("pace", "moderate"),
@@ -240,6 +274,9 @@ class StoryRuntime:
                 "current_frame": self.current_frame
             }
         }
+        self._signature = signature
+        self.version += 1
+        return self.frame
 
     def generate_full_story(self):
         """Generate complete story narrative"""